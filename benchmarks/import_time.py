@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+
+"""
+|   CLI cold start benchmark for mtcollector.                           |
+|   Runs 'python -m mtcollector.bashcollector -h' in fresh interpreters |
+|   and reports wall-clock start time and heavy modules imported.       |
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+HEAVY_MODULES = ('netmiko', 'paramiko', 'cryptography', 'socks')
+
+
+def run_once(command: list, env: dict) -> tuple:
+    """run command once in a new interpreter
+
+    Args:
+        command (list): python arguments after the interpreter
+        env (dict): process environment
+
+    Returns:
+        tuple: (seconds, set of heavy top-level modules imported)
+    """
+    started = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + command,
+                             env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    imported = set()
+    for line in process.stderr.splitlines():  # format: import time: self | cumulative | package
+        if line.startswith('import time:') and '|' in line:
+            module = line.rsplit('|', 1)[1].strip()
+            if module.split('.')[0] in HEAVY_MODULES:
+                imported.add(module.split('.')[0])
+    return elapsed, imported
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure mtcollector CLI cold start')
+    parser.add_argument('-runs', type=int, default=10, help='Number of cold starts. Default 10')
+    parser.add_argument('-max_ms', type=float, help='Exit 1 if median start time is above this value')
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    timings = []
+    heavy = set()
+    for i in range(args.runs):
+        elapsed, imported = run_once(['-m', 'mtcollector.bashcollector', '-h'], env)
+        timings.append(elapsed * 1000)
+        heavy |= imported
+    baseline = [run_once(['-c', 'pass'], env)[0] * 1000 for i in range(args.runs)]
+    median = statistics.median(timings)
+    print(f'bashcollector -h: median {median:.1f} ms, min {min(timings):.1f} ms over {args.runs} runs')
+    print(f'bare interpreter: median {statistics.median(baseline):.1f} ms')
+    print(f'heavy modules imported: {", ".join(sorted(heavy)) if heavy else "none"}')
+    if len(heavy) > 0 or (args.max_ms is not None and median > args.max_ms):
+        sys.exit(1)
@@ -7,7 +7,12 @@
 |   Based on Netmiko by K. Byers @ https://github.com/ktbyers/netmiko   |
 """
 
-from .mtcollector import MTCollector
+__all__ = ('MTCollector', 'MTConfigPush', 'MultiThreadConnector')
 
 
-__all__ = ('MTcollector')
+def __getattr__(name):
+    """lazy import of collector, keeps 'import mtcollector' and CLI start fast"""
+    if name in __all__:
+        from . import mtcollector
+        return getattr(mtcollector, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
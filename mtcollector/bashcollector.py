@@ -2,8 +2,12 @@
 
 import json
 import argparse
+import os
 import sys
-from __init__ import MTCollector
+
+
+SOCKET_ENV = 'MTCOLLECTOR_SOCKET'  # same as daemon.SOCKET_ENV, not imported to keep -h fast
+AUTHKEY_ENV = 'MTCOLLECTOR_AUTHKEY'  # same as distributed.AUTHKEY_ENV
 
 
 def file_manager(file, output = None, operation: str = 'read'):
@@ -71,6 +75,13 @@ if __name__ == '__main__':
     parser.add_argument('-u', '-username', help='Set username to login. Note: prefer metod is -up')
     parser.add_argument('-p', '-password', help='Set password to login. Note: prefer metod is -up')
     parser.add_argument('-t', '-typeos', help='Set OS type for end devices. Default: XR')
+    parser.add_argument('-daemon', default=os.environ.get(SOCKET_ENV),
+                        help=f'Send job to collector daemon socket (or ${SOCKET_ENV}). Runs locally if not reachable')
+    parser.add_argument('-authkey', default=os.environ.get(AUTHKEY_ENV),
+                        help=f'Shared secret of collector daemon (or ${AUTHKEY_ENV})')
+    parser.add_argument('-resume',
+                        help='Set checkpoint journal file. Devices completed in an unfinished run of the same job are skipped')
+    parser.add_argument('-progress', action='store_true', help='Show live progress on stderr (local runs only)')
     #parser.add_argument('-loglvl', help='Set the logging level for the script. Default ERROR')
     #parser.add_argument('')
     args = parser.parse_args()
@@ -112,8 +123,32 @@ if __name__ == '__main__':
     else:
         ostype = 'cisco_xr'
     
-    # Runs multithread collection with input arguments
-    result_collector = MTCollector(device, show, user=username, paswd=password, os_type=ostype)
+    options = {}
+    if args.resume != None: # journal path seen by the daemon too
+        options['resume'] = os.path.abspath(args.resume)
+
+    # Runs multithread collection with input arguments, through the daemon when one is running
+    result_collector = None
+    if args.daemon != None:
+        from .daemon import submit_job
+        authkey = args.authkey.encode() if args.authkey != None else None
+        try:
+            result_collector = submit_job(args.daemon, device, show, authkey=authkey, user=username,
+                                          paswd=password, os_type=ostype, **options)
+        except ConnectionError as error:
+            print(f'{error} - collecting locally', file=sys.stderr)
+    if result_collector is None:
+        from . import MTCollector
+        if args.progress:
+            from .progress import Progress
+
+            def show_progress(snapshot):
+                print(f'\r{Progress.format(snapshot)}\033[K', end='', file=sys.stderr, flush=True)
+            options['progress'] = show_progress
+            options['progress_interval'] = 1
+        result_collector = MTCollector(device, show, user=username, paswd=password, os_type=ostype, **options)
+        if args.progress:
+            print(file=sys.stderr)
     if output_file == 'output_print':   # print output or send to file
         print(f'Results for output Job:\n\n')
         for device,output in result_collector.items():
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+"""
+|   Circuit breakers for mtcollector.                                   |
+|   After N consecutive connection failures through the same proxy or  |
+|   in the same device group, the rest of that group fails fast until   |
+|   a half-open probe succeeds.                                         |
+"""
+
+import threading
+import time
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpen(Exception):
+    """Raised instead of connecting when a breaker of the device is open
+    """
+    def __init__(self, key: tuple, retry_in: float, failed_probes: int = 0) -> None:
+        super().__init__(f'circuit {key[0]} {key[1]} open')
+        self.key = key
+        self.retry_in = retry_in
+        self.failed_probes = failed_probes
+
+
+class CircuitBreaker:
+    """Breaker of a single key (proxy or device group)
+    """
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30) -> None:
+        """main init for circuit breaker
+
+        Args:
+            threshold (int, optional): consecutive failures that open the breaker. Defaults to 5.
+            reset_timeout (float, optional): seconds open before a half-open probe is allowed. Defaults to 30.
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.failed_probes = 0  # half-open probes that failed, tells waiting devices the probe is over
+        self.opened = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """check if a connection attempt may go through, moves open to half-open after reset_timeout
+
+        Returns:
+            bool: True if allowed (closed, or this caller is the half-open probe)
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if time.monotonic() - self.opened >= self.reset_timeout:  # open, or probe that never reported
+                self.state = HALF_OPEN  # only this caller probes, others keep failing fast
+                self.opened = time.monotonic()
+                return True
+            return False
+
+    def retry_in(self) -> float:
+        """seconds until a half-open probe is allowed
+
+        Returns:
+            float: 0 if not open
+        """
+        with self.lock:
+            if self.state == CLOSED:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened))
+
+    def success(self) -> None:
+        with self.lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self.failed_probes += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                self.state = OPEN
+                self.opened = time.monotonic()
+
+
+class BreakerBoard:
+    """Breakers keyed by proxy and by device group
+    """
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30, groups=None) -> None:
+        """main init for breaker board
+
+        Args:
+            threshold (int, optional): consecutive failures that open a breaker. Defaults to 5.
+            reset_timeout (float, optional): seconds open before a half-open probe. Defaults to 30.
+            groups (dict/callable, optional): {hostname: group} or callable(device) -> group.
+                                              Defaults to None (group of each Device).
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.groups = groups
+        self.breakers = {}
+        self.lock = threading.Lock()
+
+    def keys(self, device, socks_proxy: list) -> list:
+        """breaker keys that apply to a device
+
+        Args:
+            device (class object): Device subclass object
+            socks_proxy (list): ip,port of proxy, empty if direct
+
+        Returns:
+            list: list of keys ('proxy', ip:port) / ('group', name)
+        """
+        keys = []
+        if len(socks_proxy) > 0:
+            keys.append(('proxy', f'{socks_proxy[0]}:{socks_proxy[1]}'))
+        group = None
+        if callable(self.groups):
+            group = self.groups(device)
+        elif self.groups is not None:
+            group = self.groups.get(device.get_hostname())
+        else:
+            group = device.get_group()  # group given with the device
+        if group is not None:
+            keys.append(('group', group))
+        return keys
+
+    def get(self, key: tuple) -> CircuitBreaker:
+        with self.lock:
+            if key not in self.breakers:
+                self.breakers[key] = CircuitBreaker(self.threshold, self.reset_timeout)
+            return self.breakers[key]
+
+    def allow(self, keys: list):
+        """check all breakers of a device
+
+        Args:
+            keys (list): keys from keys()
+
+        Returns:
+            tuple: (True, None) if allowed, else (False, key of the open breaker)
+        """
+        for key in keys:
+            if not self.get(key).allow():
+                return False, key
+        return True, None
+
+    def record(self, keys: list, success: bool) -> None:
+        """report connection outcome to all breakers of a device
+
+        Args:
+            keys (list): keys from keys()
+            success (bool): True if connected
+        """
+        for key in keys:
+            if success:
+                self.get(key).success()
+            else:
+                self.get(key).failure()
+
+    def retry_in(self, keys: list) -> float:
+        """seconds until every breaker of a device allows a probe
+
+        Args:
+            keys (list): keys from keys()
+
+        Returns:
+            float: seconds
+        """
+        return max([self.get(key).retry_in() for key in keys] + [0.0])
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+"""
+|   Memory budget for mtcollector outputs.                              |
+|   Counts in-flight and completed output sizes; new devices wait       |
+|   while in-flight outputs fill the budget and completed outputs       |
+|   are spilled to disk when the total goes over it.                    |
+"""
+
+import json
+import os
+import tempfile
+import threading
+from collections.abc import Sequence
+from .store import InternedOutput
+
+
+def outputs_size(outputs: list) -> int:
+    """approximate size of a device outputs (characters), interned outputs count their line ids
+
+    Args:
+        outputs (list): list of {show: output}
+
+    Returns:
+        int: total length of shows and outputs
+    """
+    return sum(len(show) + (output.stored_size() if isinstance(output, InternedOutput) else len(output))
+               for pair in outputs for show, output in pair.items())
+
+
+class SpilledOutputs(Sequence):
+    """Device outputs moved to disk, loaded again on access
+
+    Behaves as the list of {show: output} it replaces (index, iterate, len).
+    """
+    def __init__(self, filename: str, length: int) -> None:
+        """main init for spilled outputs
+
+        Args:
+            filename (str): json file holding the list
+            length (int): number of entries
+        """
+        self.filename = filename
+        self.length = length
+
+    def to_list(self) -> list:
+        """load outputs from disk
+
+        Returns:
+            list: list of {show: output}
+        """
+        with open(self.filename, 'r') as read_file:
+            return json.load(read_file)
+
+    def __getitem__(self, index):
+        return self.to_list()[index]
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __repr__(self) -> str:
+        return f'SpilledOutputs({self.filename!r}, {self.length})'
+
+
+class MemoryBudget:
+    """Shared budget for outputs of a job
+    """
+    def __init__(self, limit: int, spill_dir: str = None) -> None:
+        """main init for memory budget
+
+        Args:
+            limit (int): approximate max size (characters) of outputs kept in memory
+            spill_dir (str, optional): directory for spilled outputs. Defaults to a new temporary directory.
+        """
+        self.limit = limit
+        if spill_dir is None:
+            spill_dir = tempfile.mkdtemp(prefix='mtcollector-spill-')
+        os.makedirs(spill_dir, exist_ok=True)
+        self.spill_dir = spill_dir
+        self.in_flight = {}  # hostname: size of outputs not finished yet
+        self.in_flight_total = 0
+        self.completed = {}  # hostname: size, insertion order = oldest first
+        self.completed_total = 0
+        self.spilled = 0
+        self.condition = threading.Condition()
+
+    def wait_for_room(self) -> None:
+        """block while in-flight outputs fill the budget (backpressure on new devices)
+        """
+        with self.condition:
+            while self.in_flight_total >= self.limit and len(self.in_flight) > 0:
+                self.condition.wait()
+
+    def add(self, hostname: str, size: int) -> None:
+        """count an output received for a device in progress
+
+        Args:
+            hostname (str): device name
+            size (int): output size
+        """
+        with self.condition:
+            self.in_flight[hostname] = self.in_flight.get(hostname, 0) + size
+            self.in_flight_total += size
+
+    def release(self, hostname: str) -> None:
+        """forget in-flight outputs of a failed or cancelled device
+
+        Args:
+            hostname (str): device name
+        """
+        with self.condition:
+            self.in_flight_total -= self.in_flight.pop(hostname, 0)
+            self.condition.notify_all()
+
+    def complete(self, hostname: str, size: int) -> list:
+        """move a device from in-flight to completed
+
+        Args:
+            hostname (str): device name
+            size (int): size of stored outputs
+
+        Returns:
+            list: hostnames of completed devices to spill to get back under the limit
+        """
+        with self.condition:
+            self.in_flight_total -= self.in_flight.pop(hostname, 0)
+            self.completed[hostname] = size
+            self.completed_total += size
+            victims = []
+            excess = self.in_flight_total + self.completed_total - self.limit
+            for name, spilled_size in self.completed.items():  # oldest first
+                if excess <= 0:
+                    break
+                victims.append(name)
+                excess -= spilled_size
+            for name in victims:
+                self.completed_total -= self.completed.pop(name)
+            self.condition.notify_all()
+            return victims
+
+    def spill(self, outputs: list) -> SpilledOutputs:
+        """write outputs to disk
+
+        Args:
+            outputs (list): list of {show: output}
+
+        Returns:
+            SpilledOutputs: lazy replacement for outputs
+        """
+        with self.condition:
+            self.spilled += 1
+            number = self.spilled
+        filename = os.path.join(self.spill_dir, f'{number}.json')
+        with open(filename, 'w') as write_file:
+            json.dump(outputs, write_file, default=str)  # interned outputs are written as text
+        return SpilledOutputs(filename, len(outputs))
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+
+"""
+|   Long-running collector daemon for mtcollector.                      |
+|   Keeps the interpreter, a worker pool and warm device sessions       |
+|   alive and takes collection jobs over a local socket.                |
+"""
+
+import argparse
+import ipaddress
+import logging
+import os
+import pickle
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+from multiprocessing.dummy import Pool
+from .distributed import AUTHKEY_ENV, parse_address
+from .logsetup import configure_logging
+from .sessions import SessionPool
+
+
+SOCKET_ENV = 'MTCOLLECTOR_SOCKET'
+DEFAULT_SOCKET = '/tmp/mtcollector.sock'
+
+
+def env_authkey(authkey: bytes = None) -> bytes:
+    """authkey argument, or $MTCOLLECTOR_AUTHKEY when not set
+
+    Args:
+        authkey (bytes, optional): shared secret. Defaults to None.
+
+    Returns:
+        bytes: shared secret, None if neither is set
+    """
+    if authkey is None:
+        authkey = os.environ.get(AUTHKEY_ENV, '').encode()
+    return authkey if len(authkey) > 0 else None
+
+
+def is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:  # other hostnames are not trusted to stay local
+        return False
+
+
+class CollectorDaemon:
+    """Serves collection jobs reusing one worker pool and a SessionPool
+    """
+    def __init__(self,
+                 address: str = DEFAULT_SOCKET,
+                 authkey: bytes = None,
+                 max_threads: int = 12,
+                 idle_timeout: float = 300,
+                 max_idle: int = 1000) -> None:
+        """main init for collector daemon
+
+        Args:
+            address (str, optional): /path/to/socket or loopback host:port to listen on.
+                                     Defaults to /tmp/mtcollector.sock.
+            authkey (bytes, optional): shared secret for clients, required on host:port. Defaults to
+                                       $MTCOLLECTOR_AUTHKEY, unix sockets rely on socket permissions without it.
+            max_threads (int, optional): working threads kept alive. Defaults to 12.
+            idle_timeout (float, optional): seconds an idle device session is kept. Defaults to 300.
+            max_idle (int, optional): max idle device sessions kept. Defaults to 1000.
+
+        Raises:
+            ValueError: if host:port is not a loopback address or has no authkey (requests are unpickled)
+        """
+        address = parse_address(address)
+        authkey = env_authkey(authkey)
+        if isinstance(address, tuple):
+            if not is_loopback(address[0]):
+                raise ValueError(f'daemon listens on loopback only, {address[0]} given')
+            if authkey is None:
+                raise ValueError(f'authkey required on host:port, set argument or {AUTHKEY_ENV}')
+        self.address = address
+        self.authkey = authkey
+        self.max_threads = max_threads
+        self.thread_pool = Pool(max_threads)
+        self.session_pool = SessionPool(idle_timeout, max_idle)
+        self.stopped = threading.Event()
+
+    def __reaper(self) -> None:
+        """close idle sessions periodically
+        """
+        interval = max(1, self.session_pool.idle_timeout / 4)
+        while not self.stopped.wait(interval):
+            closed = self.session_pool.expire_idle()
+            if closed > 0:
+                logging.info(f'Closed {closed} idle session(s)')
+
+    def run_job(self, devices, shows, **kwargs) -> dict:
+        """run a collection job with the daemon pool and warm sessions
+
+        Args:
+            devices (str/dict/list): device(s) to connect to, same format as MTCollector
+            shows (str/list): show commands to execute in each device
+            **kwargs: MTCollector arguments (user, paswd, os_type...)
+
+        Returns:
+            dict: dict of devices and outputs
+        """
+        from .mtcollector import MTCollector
+
+        kwargs.setdefault('max_threads', self.max_threads)
+        kwargs['session_pool'] = self.session_pool
+        kwargs['thread_pool'] = self.thread_pool
+        return MTCollector(devices, shows, **kwargs)
+
+    def __serve_client(self, conn) -> None:
+        """handle requests of a single client connection
+
+        Args:
+            conn (Connection): accepted client connection
+        """
+        try:
+            while True:
+                try:
+                    request = conn.recv()
+                except EOFError:
+                    break
+                if request.get('op') == 'ping':
+                    conn.send({'status': 'ok', 'idle_sessions': len(self.session_pool)})
+                elif request.get('op') == 'shutdown':
+                    conn.send({'status': 'ok'})
+                    self.stop()
+                    break
+                elif request.get('op') == 'collect':
+                    try:
+                        result = self.run_job(request['devices'], request['shows'], **request.get('kwargs', {}))
+                        conn.send({'status': 'ok', 'result': result})
+                    except Exception as error:  # bad job arguments or failed job, client keeps its connection
+                        logging.error(f'Job failed - {error!r}')
+                        conn.send({'status': 'error', 'error': f'{type(error).__name__}: {error}'})
+                else:
+                    conn.send({'status': 'error', 'error': f'unknown op {request.get("op")}'})
+        except OSError as error:
+            logging.error(f'Client connection lost - {error}')
+        finally:
+            conn.close()
+
+    def serve_forever(self) -> None:
+        """listen for jobs until a shutdown request is received
+        """
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            try:
+                Client(self.address, authkey=self.authkey).close()
+                raise RuntimeError(f'Collector daemon already running on {self.address}')
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.address)  # stale socket left by a previous daemon
+        self.listener = Listener(self.address, authkey=self.authkey)
+        if isinstance(self.address, str):
+            os.chmod(self.address, 0o600)  # unix socket: only the owner submits jobs
+        reaper = threading.Thread(target=self.__reaper, daemon=True)
+        reaper.start()
+        logging.info(f'Collector daemon listening on {self.listener.address}')
+        while not self.stopped.is_set():
+            try:
+                conn = self.listener.accept()
+            except Exception as error:
+                if not self.stopped.is_set():
+                    logging.error(f'Client connection refused - {error}')
+                continue
+            client = threading.Thread(target=self.__serve_client, args=(conn,), daemon=True)
+            client.start()
+        self.listener.close()
+        self.session_pool.close_all()
+        self.thread_pool.close()
+        self.thread_pool.join()
+        logging.info('Collector daemon stopped')
+
+    def stop(self) -> None:
+        """stop accepting jobs, serve_forever closes sessions and pool
+        """
+        self.stopped.set()
+        try:  # wake up accept()
+            Client(self.listener.address, authkey=self.authkey).close()
+        except Exception:
+            pass
+
+
+def submit_job(address, devices, shows, authkey: bytes = None, **kwargs) -> dict:
+    """client side, send a collection job to a running daemon
+
+    Args:
+        address (str): daemon /path/to/socket or host:port
+        devices (str/dict/list): device(s) to connect to, same format as MTCollector
+        shows (str/list): show commands to execute in each device
+        authkey (bytes, optional): shared secret of daemon. Defaults to $MTCOLLECTOR_AUTHKEY.
+        **kwargs: MTCollector arguments (user, paswd, os_type...)
+
+    Raises:
+        ConnectionError: if daemon is not reachable, refused the authkey or dropped the connection
+        ValueError: if daemon rejected the job
+
+    Returns:
+        dict: dict of devices and outputs
+    """
+    try:
+        conn = Client(parse_address(address), authkey=env_authkey(authkey))
+    except (FileNotFoundError, ConnectionRefusedError, AuthenticationError, EOFError) as error:
+        raise ConnectionError(f'Collector daemon not reachable at {address} - {error!r}')
+    try:
+        conn.send({'op': 'collect', 'devices': devices, 'shows': shows, 'kwargs': kwargs})
+        response = conn.recv()
+    except (EOFError, OSError, pickle.UnpicklingError) as error:  # unpickling error: daemon asked for an authkey
+        raise ConnectionError(f'Collector daemon at {address} dropped the job - {error!r}')
+    finally:
+        conn.close()
+    if response['status'] != 'ok':
+        raise ValueError(response['error'])
+    return response['result']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='mtcollector daemon, keeps sessions warm between jobs')
+    parser.add_argument('-socket', default=os.environ.get(SOCKET_ENV, DEFAULT_SOCKET),
+                        help=f'Unix socket path or loopback host:port to listen on. Default {DEFAULT_SOCKET}')
+    parser.add_argument('-authkey', default=os.environ.get(AUTHKEY_ENV),
+                        help=f'Shared secret of clients (or ${AUTHKEY_ENV}). Required on host:port')
+    parser.add_argument('-threads', type=int, default=12, help='Set working threads. Default 12')
+    parser.add_argument('-idle', type=float, default=300, help='Seconds an idle session is kept. Default 300')
+    parser.add_argument('-loglvl', default='error', help='Set the logging level for the daemon. Default ERROR')
+    args = parser.parse_args()
+    configure_logging(args.loglvl, queued=True)
+    authkey = args.authkey.encode() if args.authkey is not None else None
+    CollectorDaemon(args.socket, authkey=authkey, max_threads=args.threads, idle_timeout=args.idle).serve_forever()
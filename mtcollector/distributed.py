@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+
+"""
+|   Coordinator/worker mode for mtcollector.                            |
+|   The coordinator splits devices in shards and hands them over        |
+|   TCP or Unix sockets to worker processes (local or remote hosts).    |
+|   Shards of workers that die or hang are re-queued.                   |
+"""
+
+import argparse
+import logging
+import os
+import queue
+import threading
+import time
+from multiprocessing import Process
+from multiprocessing.connection import Listener, Client
+from .logsetup import configure_logging
+
+
+AUTHKEY_ENV = 'MTCOLLECTOR_AUTHKEY'
+
+
+def parse_address(address):
+    """convert 'host:port' to a tcp tuple, anything else is a unix socket path
+
+    Args:
+        address (str/tuple): host:port, (host, port) or /path/to/socket
+
+    Returns:
+        tuple/str: address accepted by multiprocessing.connection
+    """
+    if isinstance(address, tuple):
+        return address
+    if ':' in address and not address.startswith('/'):
+        host, port = address.rsplit(':', 1)
+        return (host, int(port))
+    return address
+
+
+def split_shards(devices, shard_size: int) -> list:
+    """split devices in shards keeping input type (list or dict)
+
+    Args:
+        devices (list/dict): list of ipaddress or {hostname: ipaddress}
+        shard_size (int): max devices per shard
+
+    Returns:
+        list: list of shards
+    """
+    if isinstance(devices, dict):
+        items = list(devices.items())
+        return [dict(items[i:i + shard_size]) for i in range(0, len(items), shard_size)]
+    if isinstance(devices, str):
+        return [[devices]]
+    return [list(devices[i:i + shard_size]) for i in range(0, len(devices), shard_size)]
+
+
+def merge_result(main_dict: dict, result: dict) -> None:
+    """merge a shard result in main result, status lists are extended
+
+    Args:
+        main_dict (dict): job result
+        result (dict): shard result as returned by MTCollector
+    """
+    for key, value in result.items():
+        if key in ('not_connected', 'deadline', 'circuit_open'):
+            main_dict.setdefault(key, []).extend(value)
+        else:
+            main_dict[key] = value
+
+
+class Coordinator:
+    """Hands device shards to workers and gathers their results
+    """
+    def __init__(self,
+                 address,
+                 authkey: bytes = None,
+                 shard_size: int = 20,
+                 shard_timeout: float = None,
+                 max_attempts: int = 3) -> None:
+        """main init for coordinator
+
+        Args:
+            address (str/tuple): host:port or /path/to/socket to listen on
+            authkey (bytes, optional): shared secret, workers must use the same. Defaults to $MTCOLLECTOR_AUTHKEY.
+                                       NOTE: it authenticates workers, traffic (credentials included) is not encrypted
+            shard_size (int, optional): devices sent to a worker at once. Defaults to 20.
+            shard_timeout (float, optional): seconds a worker can hold a shard before it is re-queued. Defaults to None.
+            max_attempts (int, optional): workers lost on a shard before it is given up (not_collected), so a
+                                          shard crashing its workers does not take down the whole fleet.
+                                          Defaults to 3.
+        """
+        if authkey is None:
+            authkey = os.environ.get(AUTHKEY_ENV, '').encode()
+        if len(authkey) == 0:
+            raise ValueError(f'authkey required, set argument or {AUTHKEY_ENV}')
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.shard_size = shard_size
+        self.shard_timeout = shard_timeout
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+
+    def __serve_worker(self, conn) -> None:
+        """feed shards to a single worker until the job is done or the worker fails
+
+        Args:
+            conn (Connection): accepted worker connection
+        """
+        with self.lock:
+            self.connected += 1
+        try:
+            self.__feed_worker(conn)
+        finally:
+            with self.lock:
+                self.connected -= 1
+
+    def __feed_worker(self, conn) -> None:
+        """send shards to a worker and merge results, a lost worker re-queues its shard until max_attempts
+
+        Args:
+            conn (Connection): accepted worker connection
+        """
+        while not self.done.is_set():
+            try:
+                shard_id = self.shards.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                conn.send({'shard': shard_id, 'devices': self.shard_list[shard_id],
+                           'shows': self.shows, 'kwargs': self.kwargs})
+                if self.shard_timeout is not None and not conn.poll(self.shard_timeout):
+                    raise TimeoutError(f'shard {shard_id} not returned in {self.shard_timeout}s')
+                message = conn.recv()
+            except (EOFError, OSError, TimeoutError) as error:
+                with self.lock:
+                    self.attempts[shard_id] = self.attempts.get(shard_id, 0) + 1
+                    given_up = self.attempts[shard_id] >= self.max_attempts
+                    if given_up:
+                        self.failed.add(shard_id)
+                        self.__check_done()
+                if given_up:
+                    logging.error(f'Worker lost, shard {shard_id} given up after {self.max_attempts} attempt(s) '
+                                  f'- {error}')
+                else:
+                    logging.error(f'Worker lost, re-queuing shard {shard_id} - {error}')
+                    self.shards.put(shard_id)
+                conn.close()
+                return
+            with self.lock:
+                if shard_id not in self.completed:  # a re-queued shard may come back twice
+                    self.completed.add(shard_id)
+                    self.failed.discard(shard_id)  # given up, then returned by a slow worker
+                    merge_result(self.main_dict, message['result'])
+                    logging.info(f'Shard {shard_id} done ({len(self.completed)}/{len(self.shard_list)})')
+                self.__check_done()
+        try:
+            conn.send({'stop': True})
+        except (EOFError, OSError):
+            pass
+        conn.close()
+
+    def __check_done(self) -> None:
+        """set done once every shard is collected or given up, called with lock held
+        """
+        if len(self.completed) + len(self.failed) == len(self.shard_list):
+            self.done.set()
+
+    def __accept_loop(self, listener) -> None:
+        """accept workers and start a serving thread for each
+
+        Args:
+            listener (Listener): coordinator listener
+        """
+        while not self.closing.is_set():
+            try:
+                conn = listener.accept()
+            except Exception as error:  # includes failed authentication
+                if not self.done.is_set():
+                    logging.error(f'Worker connection refused - {error}')
+                continue
+            if self.done.is_set():  # late worker, closing lets it exit instead of hanging in the handshake
+                conn.close()
+                continue
+            worker = threading.Thread(target=self.__serve_worker, args=(conn,), daemon=True)
+            worker.start()
+
+    def __wake(self, address) -> None:
+        try:
+            Client(address, authkey=self.authkey).close()
+        except Exception:
+            pass
+
+    def run(self, devices, shows, local_workers: int = 0, timeout: float = None, **kwargs) -> dict:
+        """distribute a collection job and wait for all shards
+
+        Args:
+            devices (list/dict): device(s) to connect to, same format as MTCollector
+            shows (str/list): show commands to execute in each device
+            local_workers (int, optional): worker processes to start on this host. Defaults to 0.
+            timeout (float, optional): seconds to wait for all shards. Defaults to None (no limit, with
+                                       local_workers the run also ends once they all died and no worker is
+                                       connected).
+            **kwargs: MTCollector arguments passed to workers (user, paswd, os_type...)
+
+        Returns:
+            dict: merged dict of devices and outputs, shards not collected listed under 'not_collected'
+        """
+        self.shard_list = split_shards(devices, self.shard_size)
+        self.shows = shows
+        self.kwargs = kwargs
+        self.main_dict = {}
+        self.completed = set()
+        self.failed = set()  # shards given up after max_attempts
+        self.attempts = {}  # shard: workers lost on it
+        self.connected = 0  # workers being served
+        self.done = threading.Event()
+        self.closing = threading.Event()  # stops the acceptor once local workers are gone
+        self.shards = queue.Queue()
+        for shard_id in range(len(self.shard_list)):
+            self.shards.put(shard_id)
+        if len(self.shard_list) == 0:
+            return self.main_dict
+        listener = Listener(self.address, authkey=self.authkey)
+        acceptor = threading.Thread(target=self.__accept_loop, args=(listener,), daemon=True)
+        acceptor.start()
+        processes = []
+        for i in range(local_workers):
+            process = Process(target=run_worker, args=(listener.address, self.authkey), daemon=True)
+            process.start()
+            processes.append(process)
+        logging.info(f'Coordinator listening on {listener.address}, {len(self.shard_list)} shard(s)')
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.done.wait(0.5):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            with self.lock:
+                connected = self.connected
+            if local_workers > 0 and connected == 0 and not any(process.is_alive() for process in processes):
+                logging.error('All workers lost, stopping with shards left')  # remote-only runs keep waiting
+                break
+        self.done.set()
+        for process in processes:
+            process.join(timeout=5)
+        self.closing.set()
+        # wake up accept() from a thread: a remote worker connecting meanwhile may end the acceptor first
+        waker = threading.Thread(target=self.__wake, args=(listener.address,), daemon=True)
+        waker.start()
+        acceptor.join(timeout=5)
+        listener.close()
+        with self.lock:
+            missing = [i for i in range(len(self.shard_list)) if i not in self.completed]
+            for shard_id in missing:
+                shard = self.shard_list[shard_id]
+                self.main_dict.setdefault('not_collected', []).extend(shard)  # dict shard extends hostnames
+            return self.main_dict
+
+
+def run_worker(address, authkey: bytes = None) -> None:
+    """connect to a coordinator and collect shards until told to stop
+
+    Args:
+        address (str/tuple): coordinator host:port or /path/to/socket
+        authkey (bytes, optional): shared secret. Defaults to $MTCOLLECTOR_AUTHKEY.
+    """
+    from .mtcollector import MTCollector
+
+    if authkey is None:
+        authkey = os.environ.get(AUTHKEY_ENV, '').encode()
+    conn = Client(parse_address(address), authkey=authkey)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message.get('stop'):
+            break
+        started = time.monotonic()
+        try:
+            result = MTCollector(message['devices'], message['shows'], **message['kwargs'])
+        except Exception as error:  # report shard as failed instead of dying
+            logging.error(f'Shard {message["shard"]} failed - {error}')
+            devices = message['devices']
+            result = {'not_connected': list(devices.keys() if isinstance(devices, dict) else devices)}
+        logging.info(f'Shard {message["shard"]} collected in {time.monotonic() - started:.1f}s')
+        conn.send({'shard': message['shard'], 'result': result})
+    conn.close()
+
+
+def MTDistributed(devices, shows, address, authkey: bytes = None, shard_size: int = 20,
+                  local_workers: int = 0, timeout: float = None, shard_timeout: float = None,
+                  max_attempts: int = 3, **kwargs) -> dict:
+    """Factory func """
+    coordinator = Coordinator(address, authkey, shard_size, shard_timeout, max_attempts)
+    return coordinator.run(devices, shows, local_workers=local_workers, timeout=timeout, **kwargs)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='mtcollector distributed worker')
+    parser.add_argument('connect', help='Coordinator address, host:port or /path/to/socket')
+    parser.add_argument('-loglvl', default='error', help='Set the logging level for the worker. Default ERROR')
+    args = parser.parse_args()
+    configure_logging(args.loglvl, queued=True)
+    run_worker(args.connect)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+"""
+|   Fingerprint gated collection for mtcollector.                       |
+|   A cheap command (last commit id / config change time) is compared   |
+|   with the cached value, expensive outputs are reused when equal.     |
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+
+
+# cheap command per netmiko device_type, output changes whenever the configuration changes
+FINGERPRINT_COMMANDS = {
+    'cisco_xr': 'show configuration commit list 1',
+    'cisco_xe': 'show running-config | include Last configuration change',
+    'cisco_ios': 'show running-config | include Last configuration change',
+    'cisco_nxos': 'show running-config | include "!Running configuration last done at"',
+    'juniper_junos': 'show system commit | match "^0 "',
+    'juniper': 'show system commit | match "^0 "',
+    'arista_eos': 'show running-config | include last modified',
+}
+
+# IOS-XR and others print current time on top of every show output
+TIMESTAMP_LINE = re.compile(r'^\s*(Mon|Tue|Wed|Thu|Fri|Sat|Sun) \w{3} +\d+ \d\d:\d\d:\d\d')
+
+# command rejected by the device, its output never changes with the configuration
+ERROR_LINE = re.compile(r'^\s*(% ?(Invalid|Incomplete|Ambiguous|Unknown|Bad)|\^$|syntax error|error:|unknown command)',
+                        re.IGNORECASE | re.MULTILINE)
+
+# shows gated by default, outputs that only change with the configuration
+CONFIG_SHOW = re.compile(r'^\s*sh(ow)?\s+(run|conf|startup)', re.IGNORECASE)
+
+
+def normalize(output: str) -> str:
+    """drop volatile lines (current time banner) and surrounding blanks
+
+    Args:
+        output (str): fingerprint command output
+
+    Returns:
+        str: comparable fingerprint
+    """
+    lines = [line.rstrip() for line in output.splitlines() if not TIMESTAMP_LINE.match(line)]
+    return '\n'.join(lines).strip()
+
+
+def usable(fingerprint: str) -> bool:
+    """check a fingerprint can tell configuration changes apart, empty output (include matching
+    nothing) or a rejected command would serve cached outputs forever
+
+    Args:
+        fingerprint (str): normalized fingerprint
+
+    Returns:
+        bool: False if outputs must always be collected
+    """
+    return len(fingerprint) > 0 and ERROR_LINE.search(fingerprint) is None
+
+
+def config_shows(shows: list) -> list:
+    """shows gated when none are given explicitly, configuration shows only
+
+    Args:
+        shows (list): show commands
+
+    Returns:
+        list: shows matching CONFIG_SHOW
+    """
+    return [show for show in shows if CONFIG_SHOW.match(show)]
+
+
+class FingerprintCache:
+    """Last fingerprint and gated outputs of each device, persisted to a json file
+    """
+    def __init__(self, filename: str, commands: dict = None) -> None:
+        """main init for fingerprint cache
+
+        Args:
+            filename (str): /path/file.json where fingerprints and outputs are kept between runs
+            commands (dict, optional): {os_type: command} overriding FINGERPRINT_COMMANDS. Defaults to None.
+        """
+        self.filename = filename
+        self.commands = dict(FINGERPRINT_COMMANDS)
+        if commands is not None:
+            self.commands.update(commands)
+        self.devices = {}
+        self.lock = threading.Lock()
+        try:
+            with open(filename, 'r') as read_file:
+                self.devices = json.load(read_file)
+        except FileNotFoundError:
+            pass
+        except ValueError as error:
+            logging.error(f'Fingerprint cache {filename} unreadable, starting empty - {error}')
+
+    def command(self, os_type: str):
+        """fingerprint command for os type
+
+        Args:
+            os_type (str): netmiko device_type
+
+        Returns:
+            str: command, None if os type has no fingerprint (always collect)
+        """
+        return self.commands.get(os_type)
+
+    def lookup(self, hostname: str, fingerprint: str, shows: list):
+        """cached outputs if fingerprint is unchanged and every show is cached
+
+        Args:
+            hostname (str): device name
+            fingerprint (str): normalized fingerprint just collected
+            shows (list): gated show commands
+
+        Returns:
+            list: list of {show: output}, None if outputs must be collected
+        """
+        with self.lock:
+            entry = self.devices.get(hostname)
+            if entry is None or entry['fingerprint'] != fingerprint:
+                return None
+            if not all(show in entry['outputs'] for show in shows):
+                return None
+            return [{show: entry['outputs'][show]} for show in shows]
+
+    def update(self, hostname: str, fingerprint: str, outputs: list) -> None:
+        """store fingerprint and outputs collected with it
+
+        Args:
+            hostname (str): device name
+            fingerprint (str): normalized fingerprint
+            outputs (list): list of {show: output}
+        """
+        with self.lock:
+            entry = self.devices.get(hostname)
+            if entry is None or entry['fingerprint'] != fingerprint:
+                entry = {'fingerprint': fingerprint, 'outputs': {}}
+                self.devices[hostname] = entry
+            for pair in outputs:
+                entry['outputs'].update(pair)
+
+    def save(self) -> None:
+        """write cache to file (atomic replace)
+        """
+        with self.lock:
+            temp_file = f'{self.filename}.tmp'
+            with open(temp_file, 'w') as write_file:
+                json.dump(self.devices, write_file)
+            os.replace(temp_file, self.filename)
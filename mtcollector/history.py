@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+
+"""
+|   Collection duration history for mtcollector.                        |
+|   Keeps per-device wall-clock times between runs so the pool can      |
+|   start the slowest devices first (LPT scheduling), and per-command   |
+|   durations used to set each command read_timeout.                    |
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+
+
+class DurationHistory:
+    """Per-device collection durations persisted to a json file
+    """
+    def __init__(self,
+                 filename: str,
+                 alpha: float = 0.5,
+                 window: int = 200,
+                 min_samples: int = 5,
+                 margin: float = 2.0,
+                 floor: float = 5.0,
+                 ceiling: float = 600.0,
+                 per_device: bool = True) -> None:
+        """main init for duration history
+
+        Args:
+            filename (str): /path/file.json where durations are kept between runs
+            alpha (float, optional): weight of the newest sample in the moving average. Defaults to 0.5.
+            window (int, optional): latest command durations kept per (os_type, command). Defaults to 200.
+            min_samples (int, optional): samples needed before a learned read_timeout is used. Defaults to 5.
+            margin (float, optional): read_timeout = p99 duration * margin. Defaults to 2.0.
+            floor (float, optional): min read_timeout in seconds. Defaults to 5.0.
+            ceiling (float, optional): max read_timeout in seconds. Defaults to 600.0.
+            per_device (bool, optional): also keep command durations per device, used once a device has
+                                         min_samples of a command (os_type durations until then).
+                                         Defaults to True.
+        """
+        self.filename = filename
+        self.alpha = alpha
+        self.window = window
+        self.min_samples = min_samples
+        self.margin = margin
+        self.floor = floor
+        self.ceiling = ceiling
+        self.per_device = per_device
+        self.devices = {}
+        self.commands = {}  # {os_type: {command: latest durations}}
+        self.device_commands = {}  # {hostname: {command: latest durations}}, per_device only
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """load durations from file, missing or unreadable file starts an empty history
+        """
+        try:
+            with open(self.filename, 'r') as read_file:
+                content = json.load(read_file)
+            self.devices = content.get('devices', {})
+            self.commands = content.get('commands', {})
+            self.device_commands = content.get('device_commands', {})
+        except FileNotFoundError:
+            self.devices = {}
+        except (ValueError, AttributeError) as error:
+            logging.error(f'Duration history {self.filename} unreadable, starting empty - {error}')
+            self.devices = {}
+            self.commands = {}
+            self.device_commands = {}
+
+    def save(self) -> None:
+        """write durations to file (atomic replace)
+        """
+        with self.lock:
+            content = {'devices': self.devices, 'commands': self.commands}
+            if self.per_device:
+                content['device_commands'] = self.device_commands
+            temp_file = f'{self.filename}.tmp'
+            with open(temp_file, 'w') as write_file:
+                json.dump(content, write_file, indent=4)
+            os.replace(temp_file, self.filename)
+
+    def record(self, hostname: str, os_type: str, seconds: float) -> None:
+        """add a duration sample for a device
+
+        Args:
+            hostname (str): device name
+            os_type (str): netmiko device_type of the device
+            seconds (float): wall-clock time spent on the device
+        """
+        with self.lock:
+            entry = self.devices.get(hostname)
+            if entry is None:
+                self.devices[hostname] = {'os_type': os_type, 'duration': seconds, 'samples': 1}
+            else:
+                entry['duration'] = self.alpha * seconds + (1 - self.alpha) * entry['duration']
+                entry['samples'] = entry.get('samples', 0) + 1
+                entry['os_type'] = os_type
+
+    def record_command(self, hostname: str, os_type: str, command: str, seconds: float) -> None:
+        """add a duration sample for a command, only the latest window samples are kept
+
+        Args:
+            hostname (str): device name
+            os_type (str): netmiko device_type of the device
+            command (str): command sent
+            seconds (float): time waiting for the command output
+        """
+        with self.lock:
+            targets = [self.commands.setdefault(os_type, {})]
+            if self.per_device:
+                targets.append(self.device_commands.setdefault(hostname, {}))
+            for target in targets:
+                samples = target.setdefault(command, [])
+                samples.append(round(seconds, 3))
+                del samples[:-self.window]
+
+    def record_timeout(self, hostname: str, os_type: str, command: str, read_timeout: float) -> None:
+        """add a censored sample for a command that hit its read_timeout, the real duration is unknown
+        but longer, so read_timeout * margin is recorded and the learned timeout grows
+
+        Args:
+            hostname (str): device name
+            os_type (str): netmiko device_type of the device
+            command (str): command sent
+            read_timeout (float): timeout the command exceeded
+        """
+        self.record_command(hostname, os_type, command, min(self.ceiling, read_timeout * self.margin))
+
+    def read_timeout(self, hostname: str, os_type: str, command: str, default: float) -> float:
+        """learned read_timeout of a command: p99 duration * margin, clamped to floor/ceiling
+
+        Args:
+            hostname (str): device name
+            os_type (str): netmiko device_type of the device
+            command (str): command to send
+            default (float): read_timeout used until min_samples are known
+
+        Returns:
+            float: seconds
+        """
+        with self.lock:
+            samples = self.device_commands.get(hostname, {}).get(command, [])
+            if len(samples) < self.min_samples:
+                samples = self.commands.get(os_type, {}).get(command, [])
+            if len(samples) < self.min_samples:
+                return default
+            ordered = sorted(samples)
+        p99 = ordered[math.ceil(0.99 * len(ordered)) - 1]
+        return min(self.ceiling, max(self.floor, p99 * self.margin))
+
+    def os_type_average(self, os_type: str):
+        """average duration of known devices for an os type
+
+        Args:
+            os_type (str): netmiko device_type
+
+        Returns:
+            float: average duration, None if no device of that type is known
+        """
+        durations = [entry['duration'] for entry in self.devices.values() if entry.get('os_type') == os_type]
+        if len(durations) == 0:
+            return None
+        return sum(durations) / len(durations)
+
+    def expected(self, hostname: str, os_type: str):
+        """expected duration for a device, falls back to os_type average for unknown devices
+
+        Args:
+            hostname (str): device name
+            os_type (str): netmiko device_type
+
+        Returns:
+            float: expected seconds, None if nothing is known
+        """
+        with self.lock:
+            entry = self.devices.get(hostname)
+            if entry is not None:
+                return entry['duration']
+            return self.os_type_average(os_type)
+
+    def order(self, devices: list) -> list:
+        """sort devices longest expected first, devices with no estimate at all go first
+
+        Args:
+            devices (list): list of Device class object
+
+        Returns:
+            list: new list of Device class object
+        """
+        estimates = [self.expected(dev.get_hostname(), dev.get_type()) for dev in devices]
+        indexed = sorted(range(len(devices)),
+                         key=lambda i: estimates[i] if estimates[i] is not None else math.inf,  # unknown = start early
+                         reverse=True)
+        return [devices[i] for i in indexed]
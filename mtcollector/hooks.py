@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+
+"""
+|   Per-device event hooks for mtcollector.                             |
+|   Callbacks run as soon as each event happens, inline on the worker   |
+|   thread or on a separate bounded executor.                           |
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+HOOK_EVENTS = ('on_connect', 'on_command_output', 'on_device_done', 'on_failure')
+
+
+class Hooks:
+    """Collection event callbacks
+
+    Callback signatures:
+        on_connect(hostname)
+        on_command_output(hostname, show, output)
+        on_device_done(hostname, outputs)     outputs: list of {show: output}
+        on_failure(hostname, status)          status: 'not_connected', 'deadline', 'push_failed' or 'circuit_open'
+    """
+    def __init__(self,
+                 on_connect=None,
+                 on_command_output=None,
+                 on_device_done=None,
+                 on_failure=None,
+                 max_workers: int = None,
+                 max_pending: int = 1000) -> None:
+        """main init for hooks
+
+        Args:
+            on_connect (callable, optional): session opened. Defaults to None.
+            on_command_output (callable, optional): a show output is available. Defaults to None.
+            on_device_done (callable, optional): all outputs of a device are available. Defaults to None.
+            on_failure (callable, optional): device failed or was cancelled. Defaults to None.
+            max_workers (int, optional): run callbacks on an executor with this many threads,
+                                         None runs them inline on collection threads. Defaults to None.
+            max_pending (int, optional): max queued callbacks, workers wait when reached. Defaults to 1000.
+        """
+        self.callbacks = {
+            'on_connect': on_connect,
+            'on_command_output': on_command_output,
+            'on_device_done': on_device_done,
+            'on_failure': on_failure,
+        }
+        self.executor = None
+        if max_workers is not None:
+            self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='mtcollector-hook')
+            self.pending = threading.BoundedSemaphore(max_pending)
+
+    def wants(self, event: str) -> bool:
+        """check if a callback is set for event, lets callers skip building arguments
+
+        Args:
+            event (str): one of HOOK_EVENTS
+
+        Returns:
+            bool: True if callback set
+        """
+        return self.callbacks.get(event) is not None
+
+    def __call(self, event: str, callback, args: tuple) -> None:
+        """run callback, errors are logged and never reach the collection
+
+        Args:
+            event (str): event name
+            callback (callable): hook callback
+            args (tuple): callback arguments
+        """
+        try:
+            callback(*args)
+        except Exception as error:
+            logging.error('Hook %s failed for %s - %s', event, args[0], error)
+
+    def __release(self, future) -> None:
+        self.pending.release()
+
+    def emit(self, event: str, *args) -> None:
+        """run callback of event inline or on the executor
+
+        Args:
+            event (str): one of HOOK_EVENTS
+            *args: callback arguments, first is always hostname
+        """
+        callback = self.callbacks.get(event)
+        if callback is None:
+            return
+        if self.executor is None:
+            self.__call(event, callback, args)
+            return
+        self.pending.acquire()  # backpressure when callbacks fall behind
+        future = self.executor.submit(self.__call, event, callback, args)
+        future.add_done_callback(self.__release)
+
+    def close(self, wait: bool = True) -> None:
+        """stop executor, waiting for queued callbacks by default
+
+        Args:
+            wait (bool, optional): wait for pending callbacks. Defaults to True.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+
+
+class HookChain:
+    """Several Hooks objects used as one, events go to each in order
+    """
+    def __init__(self, *hooks) -> None:
+        """main init for hook chain
+
+        Args:
+            *hooks (Hooks): hooks to call, None entries are ignored
+        """
+        self.hooks = [hook for hook in hooks if hook is not None]
+
+    def wants(self, event: str) -> bool:
+        return any(hook.wants(event) for hook in self.hooks)
+
+    def emit(self, event: str, *args) -> None:
+        for hook in self.hooks:
+            hook.emit(event, *args)
+
+    def close(self, wait: bool = True) -> None:
+        for hook in self.hooks:
+            hook.close(wait)
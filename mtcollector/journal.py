@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+
+"""
+|   Checkpoint journal for mtcollector.                                 |
+|   Appends one line per completed device pointing to its outputs on    |
+|   disk, so a job that died can be resumed with only the devices left. |
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from .budget import SpilledOutputs
+from .hooks import Hooks
+
+
+def job_digest(devices, shows) -> str:
+    """identity of a job, a journal only resumes the job it was written for
+
+    Args:
+        devices (str/dict/list): devices argument of the job
+        shows (str/list/dict): shows argument of the job
+
+    Returns:
+        str: sha256 hex digest
+    """
+    if isinstance(devices, list):
+        devices = sorted(devices, key=str)
+    content = json.dumps({'devices': devices, 'shows': shows}, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class Journal:
+    """Append-only json lines journal of completed devices
+
+    First line is {"job": digest} of the job (devices and shows), then one line per device
+    {"device": hostname, "outputs": /path/file.json, "count": entries}, and {"complete": true}
+    once the job finished with no device left. A journal of another job, or of a complete
+    one, is restarted empty. Outputs are written (atomic replace) before their line, so every
+    line points to a complete file. Lines are flushed as written, a killed process loses no
+    finished device.
+    """
+    def __init__(self, filename: str, job: str = None) -> None:
+        """main init for journal, loads completed devices of a previous run of the same job
+
+        Args:
+            filename (str): /path/file.jsonl, outputs are kept in /path/file.jsonl.d/
+            job (str, optional): job_digest() of the job. Defaults to None (any job).
+        """
+        self.filename = filename
+        self.job = job
+        self.outputs_dir = f'{filename}.d'
+        os.makedirs(self.outputs_dir, exist_ok=True)
+        self.completed = {}  # hostname: SpilledOutputs
+        self.lock = threading.Lock()
+        self.torn = False
+        if not self.load():
+            self.restart()
+        self.written = max([int(name.split('.')[0]) for name in os.listdir(self.outputs_dir)
+                            if name.split('.')[0].isdigit()] + [0])  # last outputs file number
+        self.file = open(filename, 'a')
+        if self.torn:
+            self.file.write('\n')  # end the line cut by a killed process before appending
+        if os.path.getsize(filename) == 0:
+            self.file.write(json.dumps({'job': job}) + '\n')
+            self.file.flush()
+        self.hooks = Hooks(on_device_done=self.on_device_done)
+
+    def restart(self) -> None:
+        """drop journal lines and outputs of a previous job
+        """
+        self.completed = {}
+        self.torn = False
+        for name in os.listdir(self.outputs_dir):
+            os.remove(os.path.join(self.outputs_dir, name))
+        open(self.filename, 'w').close()
+
+    def load(self) -> bool:
+        """read completed devices, a torn last line (process killed while writing) is ignored
+
+        Returns:
+            bool: False if the journal belongs to another job or its job is complete (restart it)
+        """
+        try:
+            with open(self.filename, 'r') as read_file:
+                header = read_file.readline()
+                if header == '':
+                    return True
+                try:
+                    job = json.loads(header)['job']
+                except (ValueError, KeyError, TypeError):
+                    job = None
+                if job != self.job:
+                    logging.warning(f'Journal {self.filename} written for another job, starting over')
+                    return False
+                for line in read_file:
+                    self.torn = not line.endswith('\n')
+                    try:
+                        entry = json.loads(line)
+                        if entry.get('complete'):
+                            logging.info(f'Journal {self.filename}: previous job complete, starting over')
+                            return False
+                        if os.path.exists(entry['outputs']):
+                            self.completed[entry['device']] = SpilledOutputs(entry['outputs'], entry['count'])
+                    except (ValueError, KeyError, TypeError, AttributeError):
+                        logging.error(f'Journal {self.filename}: skipping unreadable line')
+        except FileNotFoundError:
+            pass
+        if len(self.completed) > 0:
+            logging.info(f'Journal {self.filename}: {len(self.completed)} device(s) already completed')
+        return True
+
+    def on_device_done(self, hostname: str, outputs: list) -> None:
+        """write device outputs and append its journal line
+
+        Args:
+            hostname (str): device name
+            outputs (list): list of {show: output}
+        """
+        with self.lock:
+            self.written += 1
+            filename = os.path.join(self.outputs_dir, f'{self.written}.json')
+            self.completed[hostname] = SpilledOutputs(filename, len(outputs))
+        temp_file = f'{filename}.tmp'
+        with open(temp_file, 'w') as write_file:
+            json.dump(list(outputs), write_file)
+        os.replace(temp_file, filename)
+        line = json.dumps({'device': hostname, 'outputs': filename, 'count': len(outputs)})
+        with self.lock:
+            self.file.write(f'{line}\n')
+            self.file.flush()
+
+    def close(self, complete: bool = False) -> None:
+        """close journal file
+
+        Args:
+            complete (bool, optional): job finished with no device left, next run starts over. Defaults to False.
+        """
+        if complete:
+            self.file.write(json.dumps({'complete': True}) + '\n')
+        self.file.close()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+"""
+|   Logging setup for mtcollector.                                      |
+|   Configures the root logger once, optionally through a               |
+|   QueueHandler/QueueListener so file I/O leaves the worker threads.   |
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+import threading
+
+
+LOG_FORMAT = '%(asctime)s,%(msecs)03d %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s'
+LOG_DATEFMT = '%Y-%m-%d:%H:%M:%S'
+
+_lock = threading.Lock()
+_state = {'key': None, 'handler': None, 'listener': None}
+
+
+def _stop_listener() -> None:
+    """flush queued records at interpreter exit
+    """
+    with _lock:
+        if _state['listener'] is not None:
+            _state['listener'].stop()
+            _state['listener'] = None
+
+
+atexit.register(_stop_listener)
+
+
+def configure_logging(loglevel: str = None, log_filename: str = None, queued: bool = False) -> None:
+    """configure root logger, repeated calls with the same settings are a no-op
+
+    If the application configured logging itself (root logger has handlers that
+    were not added here) nothing is changed, like logging.basicConfig. Called
+    without settings, an existing configuration is kept (a daemon's -loglvl and
+    queued mode survive its jobs) and ERROR to stderr is only set up when
+    logging is not configured yet.
+
+    Args:
+        loglevel (str, optional): logging level name. Defaults to None (current level, 'error' at first).
+        log_filename (str, optional): file to save logs, None logs to stderr. Defaults to None.
+        queued (bool, optional): hand records to a QueueListener thread that does the I/O. Defaults to False.
+    """
+    root = logging.getLogger()
+    with _lock:
+        configured = _state['handler'] is not None or len(root.handlers) > 0
+        if loglevel is None and log_filename is None and not queued and configured:
+            return
+        if loglevel is None:  # other settings given, level kept
+            level = _state['key'][0] if _state['key'] is not None else logging.ERROR
+        else:
+            level = getattr(logging, loglevel.upper())  # getting attribute based on input
+        key = (level, log_filename, queued)
+        if _state['key'] == key:
+            return
+        if _state['handler'] is None and len(root.handlers) > 0:  # configured by application
+            return
+        if _state['handler'] is not None:  # settings changed, replace our handler
+            root.removeHandler(_state['handler'])
+            if _state['listener'] is not None:
+                _state['listener'].stop()
+                _state['listener'] = None
+            _state['handler'].close()
+        if log_filename is not None:
+            handler = logging.FileHandler(log_filename)
+        else:
+            handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
+        if queued:
+            records = queue.SimpleQueue()
+            _state['listener'] = logging.handlers.QueueListener(records, handler)
+            _state['listener'].start()
+            handler = logging.handlers.QueueHandler(records)
+        root.addHandler(handler)
+        root.setLevel(level)
+        _state['handler'] = handler
+        _state['key'] = key
+
+
+def log_body(enabled: bool, max_chars: int = None, sample_rate: float = 1.0) -> bool:
+    """decide if an output body is logged, so callers skip building it otherwise
+
+    Args:
+        enabled (bool): result of logger.isEnabledFor(logging.DEBUG)
+        max_chars (int, optional): body length limit, 0 disables bodies. Defaults to None (no limit).
+        sample_rate (float, optional): fraction of bodies logged. Defaults to 1.0.
+
+    Returns:
+        bool: True if the body should be logged
+    """
+    if not enabled or max_chars == 0:
+        return False
+    return sample_rate >= 1.0 or random.random() < sample_rate
+
+
+def truncate(output: str, max_chars: int = None) -> str:
+    """cut output to max_chars, noting how much was dropped
+
+    Args:
+        output (str): output body
+        max_chars (int, optional): length limit. Defaults to None (no limit).
+
+    Returns:
+        str: output or its head
+    """
+    if max_chars is None or len(output) <= max_chars:
+        return output
+    return f'{output[:max_chars]}... [{len(output) - max_chars} chars truncated]'
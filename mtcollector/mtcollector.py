@@ -7,13 +7,27 @@
 |   Based on Netmiko by K. Byers @ https://github.com/ktbyers/netmiko   |
 """
 
+import hashlib
+import json
 import logging
 import ipaddress
-import socks
-from netmiko import ConnectHandler
-from netmiko.exceptions import NetMikoAuthenticationException as authException
-from netmiko.exceptions import NetMikoTimeoutException as timeOut
+import re
+import threading
+import time
 from multiprocessing.dummy import Pool
+from .breaker import BreakerBoard, CircuitOpen
+from .budget import MemoryBudget, outputs_size
+from .fingerprint import FingerprintCache, config_shows, normalize, usable
+from .history import DurationHistory
+from .hooks import Hooks, HookChain
+from .journal import Journal, job_digest
+from .logsetup import configure_logging, log_body, truncate
+from .netsock import SOCKET_PROFILES, PROXY_KINDS, ConnectError, open_direct, open_proxied
+from .profiling import Profiler
+from .progress import Progress
+from .resolver import DNSCache
+from .tuning import TUNING_PROFILES, SAFE_PROFILE, CANDIDATES, connect_kwargs, open_session, stable_lines
+from .tuning import load_profiles, save_profiles
 
 
 __author__ = "Leandro Repetto"
@@ -26,6 +40,60 @@ __email__ = "lrepetto@gmail.com"
 __status__ = "Testing"
 
 
+# commit output of a failed commit (XR 'Failed to commit', Junos 'error:'/'commit failed')
+COMMIT_ERRORS = re.compile(r'(?i)fail|error:|abort')
+
+
+def load_drivers() -> None:
+    """import netmiko and socks, called when a collection starts so that importing
+    the package (or running the CLI help) does not pay netmiko/paramiko import time
+    """
+    import socks
+    import netmiko
+
+
+class DeferredTask:
+    """Handle of a task submitted to a pool after a delay, waits like an AsyncResult
+    """
+    def __init__(self, delay: float, pool, func, args: tuple) -> None:
+        """main init for deferred task, starts the delay timer
+
+        Args:
+            delay (float): seconds before submitting
+            pool (Pool): worker pool
+            func (callable): task routine
+            args (tuple): task arguments
+        """
+        self.event = threading.Event()
+        self.error = None
+        timer = threading.Timer(delay, self.__submit, (pool, func, args))
+        timer.daemon = True
+        timer.start()
+
+    def __submit(self, pool, func, args: tuple) -> None:
+        try:
+            pool.apply_async(func, args, callback=self.__done, error_callback=self.__failed)
+        except ValueError as error:  # pool already closed (job deadline)
+            self.__failed(error)
+
+    def __done(self, result) -> None:
+        self.event.set()
+
+    def __failed(self, error) -> None:
+        self.error = error
+        self.event.set()
+
+    def ready(self) -> bool:
+        return self.event.is_set()
+
+    def wait(self, timeout: float = None) -> None:
+        self.event.wait(timeout)
+
+    def get(self) -> None:
+        if self.error is not None:
+            raise self.error
+
+
 class MultiThreadConnector:
     """Main wrapper class for connection and multithreading
     """
@@ -38,17 +106,20 @@ class MultiThreadConnector:
         def __init__(self,
                      hostname: str = '',
                      ip: str = '',
-                     os_type: str = 'cisco_xr') -> None:
+                     os_type: str = 'cisco_xr',
+                     group: str = None) -> None:
             """main init for device class
 
             Args:
                 hostname (str, optional): hostname of device. Defaults to ''.
                 ip (str, required): ip address of a device. Defaults to ''.
                 os_type (str, optional): Netmiko OS valid device_type. Defaults to 'cisco_xr'.
+                group (str, optional): device group (site, role...) for command sets and breakers. Defaults to None.
             """
             self.hostname = hostname
             self.ipaddress = ip
             self.os_type = os_type
+            self.group = group
         
         def get_hostname(self) -> str:
             """get hostname of device, if empty returns ipaddress
@@ -77,11 +148,131 @@ class MultiThreadConnector:
             """
             return self.os_type
 
+        def get_group(self) -> str:
+            """get device group
+
+            Returns:
+                str: group, None if not set
+            """
+            return self.group
+
+    class Job:
+        """Job subclass holds the state of a single collection run, so several runs
+        can use the class at the same time without sharing results
+        """
+        def __init__(self,
+                     username: str = '',
+                     password: str = '',
+                     show_list: list = None,
+                     heavy_shows: list = None,
+                     heavy_backlog: int = 2,
+                     socks_proxy: list = None,
+                     device_timeout: float = None,
+                     history=None,
+                     session_pool=None,
+                     thread_pool=None,
+                     light_callback=None,
+                     log_output_chars: int = 2000,
+                     log_sample_rate: float = 1.0,
+                     fingerprints=None,
+                     tuning: dict = None,
+                     hooks=None,
+                     budget=None,
+                     breakers=None,
+                     breaker_mode: str = 'fail',
+                     command_sets: dict = None,
+                     gated_shows: list = None) -> None:
+            """main init for job class
+
+            Args:
+                username (str, optional): username to access devices. Defaults to ''.
+                password (str, optional): password for username. Defaults to ''.
+                show_list (list, optional): show commands to execute in each device. Defaults to [].
+                heavy_shows (list, optional): shows run in heavy lane. Defaults to [].
+                heavy_backlog (int, optional): max open sessions waiting for heavy lane. Defaults to 2.
+                socks_proxy (list, optional): ip,port for socks5 connection. Defaults to [].
+                device_timeout (float, optional): seconds allowed for each device. Defaults to None.
+                history (DurationHistory, optional): device durations for LPT ordering. Defaults to None.
+                session_pool (SessionPool, optional): warm sessions. Defaults to None.
+                thread_pool (Pool, optional): caller owned worker pool. Defaults to None.
+                light_callback (callable, optional): called when light shows of a device finished. Defaults to None.
+                log_output_chars (int, optional): max chars of an output logged at DEBUG. Defaults to 2000.
+                log_sample_rate (float, optional): fraction of outputs logged at DEBUG. Defaults to 1.0.
+                fingerprints (FingerprintCache, optional): cache gating expensive shows. Defaults to None.
+                tuning (dict, optional): {os_type: tuning profile}. Defaults to {} (netmiko defaults).
+                hooks (Hooks, optional): per-device event callbacks. Defaults to None.
+                budget (MemoryBudget, optional): memory budget for outputs. Defaults to None.
+                breakers (BreakerBoard, optional): circuit breakers per proxy/device group. Defaults to None.
+                breaker_mode (str, optional): 'fail' or 'defer' devices behind an open breaker. Defaults to 'fail'.
+                command_sets (dict, optional): {group/os_type/'default': shows}, show_list being all of
+                                               them. Defaults to None (show_list for every device).
+                gated_shows (list, optional): shows served from fingerprint cache. Defaults to configuration
+                                              shows of show_list.
+            """
+            if show_list is None:
+                show_list = []
+            if heavy_shows is None:
+                heavy_shows = []
+            if socks_proxy is None:
+                socks_proxy = []
+            self.username = username
+            self.password = password
+            self.show_list = show_list
+            self.command_sets = command_sets
+            self.heavy_list = [show for show in show_list if show in heavy_shows]
+            self.light_list = [show for show in show_list if show not in heavy_shows]
+            self.heavy_backlog = threading.BoundedSemaphore(heavy_backlog)
+            self.heavy_pool = None
+            self.socks_proxy = socks_proxy
+            self.device_timeout = device_timeout
+            self.history = history
+            self.session_pool = session_pool
+            self.thread_pool = thread_pool
+            self.light_callback = light_callback
+            self.log_output_chars = log_output_chars
+            self.log_sample_rate = log_sample_rate
+            self.fingerprints = fingerprints
+            # configuration shows when none are given, operational outputs change on their own
+            if gated_shows is None:
+                gated_shows = config_shows(show_list)
+            self.gated_list = [show for show in show_list if show in gated_shows]
+            if tuning is None:
+                tuning = {}
+            self.tuning = tuning
+            self.send_options = {}
+            self.hooks = hooks
+            self.budget = budget
+            self.breakers = breakers
+            self.breaker_mode = breaker_mode
+            self.adaptive_timeout = False
+            self.profiler = None
+            self.store = None
+            self.output_index = None
+            self.connect_timeout = 10
+            self.negotiation_timeout = 10
+            self.socket_profile = {}
+            self.connect_errors = {}  # hostname: failure kind of last socket setup
+            self.pool = None
+            self.push_failed = []
+            self.circuit_open = []
+            self.deferred = {}  # hostname: (breaker key, its failed probes) when first deferred
+            self.main_dict = {}
+            self.non_connected = []
+            self.deadline = []
+            self.expired = set()
+            self.finished = set()
+            self.partial = {}
+            self.lane_results = []
+            self.active_sessions = {}
+            self.session_keys = {}
+            self.state_lock = threading.Lock()
+
     @classmethod
-    def __connect_to(self, device,  jumpserver: dict = None):
+    def __connect_to(self, job, device,  jumpserver: dict = None):
         """Handles conection to a single device
 
         Args:
+            job (Job): state of the collection run
             device (class object): Device object
             jumpserver (dict, optional): Future support for proxy/jumpserver. Defaults to {}.
         
@@ -91,68 +282,112 @@ class MultiThreadConnector:
             if not connected:
             bool: False
         """
+        from netmiko import ConnectHandler
+        from netmiko.exceptions import NetMikoAuthenticationException as authException
+        from netmiko.exceptions import NetMikoTimeoutException as timeOut
 
         conn_device = {
             'device_type': device.get_type(),
             'ip': device.get_ipaddress(),
-            'username': self.username,  # main class attribute
-            'password': self.password   # main class attribute
+            'username': job.username,  # job attribute
+            'password': job.password   # job attribute
         }
-        if len(self.socks_proxy) > 0:
-            sock = socks.socksocket()
-            sock.set_proxy(
-                proxy_type=socks.SOCKS5,
-                addr=self.socks_proxy[0],
-                port=int(self.socks_proxy[1])
-            )
-            sock.connect((device.get_ipaddress(), 22))
-            conn_device['sock'] = sock
+        profile = job.tuning.get(device.get_type(), SAFE_PROFILE)
+        conn_device.update(connect_kwargs(profile))
+        port = conn_device.get('port', 22)
+        with job.state_lock:
+            job.connect_errors.pop(device.get_hostname(), None)
+        try:
+            if len(job.socks_proxy) > 0:  # hostnames are resolved by the proxy
+                conn_device['sock'] = open_proxied(job.socks_proxy, device.get_ipaddress(), port, job.connect_timeout,
+                                                   job.negotiation_timeout, job.socket_profile)
+            elif len(job.socket_profile) > 0:  # own socket only to set options, else netmiko connects
+                conn_device['sock'] = open_direct(device.get_ipaddress(), port, job.connect_timeout, job.socket_profile)
+        except ConnectError as error:
+            logging.error('Connection to %s failed - %s', device.get_hostname(), error)
+            with job.state_lock:
+                job.connect_errors[device.get_hostname()] = error.kind
+            return False
         try:
             connection_to = ConnectHandler(**conn_device)
-            logging.info(f'connected to {device.get_hostname()}')
+            open_session(connection_to, profile)
+            logging.info('connected to %s', device.get_hostname())
             return connection_to
         except authException: # max authentication failure supported 2
-            logging.error(f'Failed to Authenticate to {device.get_hostname()} first attempt - Retrying')
+            logging.error('Failed to Authenticate to %s first attempt - Retrying', device.get_hostname())
             try:
                 connection_to = ConnectHandler(**conn_device)
-                logging.info(f'connected to {device.get_hostname()}')
+                open_session(connection_to, profile)
+                logging.info('connected to %s', device.get_hostname())
                 return connection_to
             except authException:   # avoid user lockout
-                logging.error(f'Credentials failed for device {device.get_hostname()}')
+                logging.error('Credentials failed for device %s', device.get_hostname())
                 return False
             except EOFError:
-                logging.error(f'End Of File error received from {device.get_hostname()}')
+                logging.error('End Of File error received from %s', device.get_hostname())
                 return False
         except timeOut:
-            logging.error(f'Connection to {device.get_hostname()} timed out, is {device.get_ipaddress()} '
-                          f'the rigth address?')
+            logging.error('Connection to %s timed out, is %s the rigth address?',
+                          device.get_hostname(), device.get_ipaddress())
             return False
         except EOFError:
-            logging.error(f'End Of File error received from {device.get_hostname()}')
+            logging.error('End Of File error received from %s', device.get_hostname())
             return False
         except Exception as error:
-            logging.error(f'An Exception occured - f{error}')
+            logging.error('An Exception occured - %s', error)
             return False
 
     @classmethod
-    def __get_outputs(self, connection, timeout: int = 30):
+    def __get_outputs(self, job, connection, hostname: str = '', shows: list = None, timeout: int = 30,
+                      os_type: str = ''):
         """Handles output(s) collection for a single device
 
         Args:
+            job (Job): state of the collection run
             connection (netmiko object): established connection to device
-            timeout (int, optional): extend cli timeout in case of larger outputs. Defaults to 30.
+            hostname (str, optional): device name, used to stop early once its deadline expired. Defaults to ''.
+            shows (list, optional): show commands to run. Defaults to show_list.
+            timeout (int, optional): extend cli timeout in case of larger outputs, replaced by the learned
+                                     timeout of each command with adaptive timeouts. Defaults to 30.
+            os_type (str, optional): netmiko device_type, key of learned timeouts. Defaults to ''.
 
         Returns:
             list: list of {key: value} pairs for each output to get
         """
+        from netmiko.exceptions import ReadTimeout
+
+        if shows is None:
+            shows = job.show_list
         outputs = []
-        logging.info(f'Running show commands')
-        for show in self.show_list:  # main class attribute show_list
-            output = connection.send_command(show, read_timeout=timeout) # send show waits for output
-            logging.debug(f'Gather information for {show} command')
-            logging.debug(f'{output}')
+        logging.info('Running show commands on %s', hostname)
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)  # checked once, not per output
+        options = job.send_options.get(hostname, {})  # from tuning profile
+        for show in shows:
+            if hostname in job.expired:  # deadline reached, stop sending commands
+                logging.info('Deadline reached for %s, skipping remaining commands', hostname)
+                break
+            read_timeout = timeout
+            if job.adaptive_timeout:
+                read_timeout = job.history.read_timeout(hostname, os_type, show, timeout)
+            started = time.monotonic()
+            try:
+                output = connection.send_command(show, read_timeout=read_timeout, **options) # send show waits for output
+            except ReadTimeout:
+                if job.adaptive_timeout:  # else a too short learned timeout would never grow
+                    job.history.record_timeout(hostname, os_type, show, read_timeout)
+                raise
+            if job.adaptive_timeout:
+                job.history.record_command(hostname, os_type, show, time.monotonic() - started)
+            if debug:
+                logging.debug('Gather information for %s command', show)
+                if log_body(debug, job.log_output_chars, job.log_sample_rate):
+                    logging.debug('%s', truncate(output, job.log_output_chars))
             outputs.append({show: output})  # uses show command as key, show must be unique
-        logging.info(f'Finished collecting outputs')
+            if job.budget is not None:
+                job.budget.add(hostname, len(show) + len(output))
+            if job.hooks is not None:
+                job.hooks.emit('on_command_output', hostname, show, output)
+        logging.info('Finished collecting outputs on %s', hostname)
         return outputs
 
     @staticmethod
@@ -170,40 +405,595 @@ class MultiThreadConnector:
             ip_object = ipaddress.ip_address(ip)
             return True
         except ValueError:
-            logging.error(f'Value provided is not an IP address - Value: {ip}')
+            logging.debug(f'Value provided is not an IP address, handled as hostname - Value: {ip}')
             return False
 
     @classmethod
-    def __wrapper_output(self, device: Device) -> None:
+    def __device_list(self, devices, os_type: str, resolver=None) -> list:
+        """build Device objects from devices argument, hostnames are resolved in parallel and
+        entries that do not resolve are dropped
+
+        Args:
+            devices (str/dict/list): ipaddress/hostname, list of them or {hostname: ipaddress/hostname}, dict
+                                     values can also be {'ip': ..., 'os_type': ..., 'group': ...}
+            os_type (str): netmiko device_type of devices without their own
+            resolver (DNSCache, optional): resolves hostnames. Defaults to None (names are kept as
+                                           addresses, for remote DNS through the socks proxy).
+
+        Raises:
+            TypeError: if devices type not supported
+
+        Returns:
+            list: list of Device class object
+        """
+        if type(devices) == dict:   # expected value for dict {hostname: ipaddress}
+            entries = []
+            for hostname, value in devices.items():
+                if type(value) == dict:  # {hostname: {'ip':, 'os_type':, 'group':}}
+                    entries.append((hostname, value.get('ip', hostname), value.get('os_type', os_type),
+                                    value.get('group')))
+                else:
+                    entries.append((hostname, value, os_type, None))
+        elif type(devices) == list:
+            entries = [('', i, os_type, None) for i in devices]
+        elif type(devices) == str:  # single device
+            entries = [('', devices, os_type, None)]
+        else:   # if device type not supported rise TypeError
+            logging.error(f'Argument provided not a String, List or Dict --')
+            logging.error(f'Argument type: {str(type(devices))}. Content: {devices}')
+            raise TypeError('Argument provided not list or Dict')
+        names = dict.fromkeys(entry[1] for entry in entries if not self.__check_ipaddress(entry[1]))
+        resolved = {}
+        if resolver is not None and len(names) > 0:
+            resolved = resolver.resolve_all(list(names))
+        device_list = []
+        for hostname, address, device_type, group in entries:
+            if address in names:
+                if resolver is not None:
+                    if resolved.get(address) is None:
+                        logging.error(f'Hostname {address} did not resolve, device skipped')
+                        continue
+                    hostname = hostname or address  # results keyed by name, not by resolved ip
+                    address = resolved[address]
+            device_list.append(self.Device(hostname, address, device_type, group))
+        return device_list
+
+    @staticmethod
+    def __device_shows(job, device: Device, lane: str = None) -> list:
+        """show commands of a device, from the command set of its group, else of its os_type,
+        else the 'default' set
+
+        Args:
+            job (Job): state of the collection run
+            device (class object): Device subclass object
+            lane (str, optional): 'light' or 'heavy' to keep only shows of that lane. Defaults to None (all).
+
+        Returns:
+            list: show commands, empty if no set applies
+        """
+        shows = job.show_list
+        if job.command_sets is not None:
+            shows = []
+            for key in (device.get_group(), device.get_type(), 'default'):
+                if key in job.command_sets:
+                    shows = job.command_sets[key]
+                    break
+        if lane == 'light':
+            return [show for show in shows if show not in job.heavy_list]
+        if lane == 'heavy':
+            return [show for show in shows if show in job.heavy_list]
+        return shows
+
+    @classmethod
+    def __expire(self, job, hostname: str) -> None:
+        """Mark a device as out of time and cancel its session if one is open
+
+        Args:
+            job (Job): state of the collection run
+            hostname (str): device name as returned by Device.get_hostname()
+        """
+        with job.state_lock:
+            if hostname in job.expired or hostname in job.finished:
+                return
+            job.expired.add(hostname)
+            job.deadline.append(hostname)
+            job.partial.pop(hostname, None)
+            session = job.active_sessions.pop(hostname, None)
+        logging.error('Deadline reached for %s, cancelling session', hostname)
+        if job.budget is not None:
+            job.budget.release(hostname)
+        if job.hooks is not None:
+            job.hooks.emit('on_failure', hostname, 'deadline')
+        if session:
+            try:
+                session.disconnect()  # unblocks the worker waiting on send_command
+            except Exception as error:
+                logging.debug('Error closing session to %s - %s', hostname, error)
+
+    @staticmethod
+    def __session_key(job, device: Device) -> tuple:
+        """key of a warm session, sessions are only shared with jobs using the same login and tuning profile
+
+        Args:
+            job (Job): state of the collection run
+            device (class object): Device subclass object
+
+        Returns:
+            tuple: (ip, username, password digest, os_type, proxy, tuning profile)
+        """
+        secret = hashlib.sha256(str(job.password).encode()).hexdigest()  # plain password never kept in the pool
+        profile = json.dumps(job.tuning.get(device.get_type(), SAFE_PROFILE), sort_keys=True, default=str)
+        return (device.get_ipaddress(), job.username, secret, device.get_type(), tuple(job.socks_proxy), profile)
+
+    @classmethod
+    def __open_session(self, job, device: Device):
+        """connect to device and register the session so a deadline can cancel it
+
+        Args:
+            job (Job): state of the collection run
+            device (class object): Device subclass object
+
+        Raises:
+            CircuitOpen: if a circuit breaker of the device is open
+
+        Returns:
+            netmiko object: a connection to device, False if not connected or deadline reached
+        """
+        hostname = device.get_hostname()
+        key = self.__session_key(job, device)
+        connected = None
+        if job.session_pool is not None:
+            connected = job.session_pool.checkout(key)
+        if not connected:
+            breaker_keys = []
+            if job.breakers is not None:
+                breaker_keys = job.breakers.keys(device, job.socks_proxy)
+                allowed, open_key = job.breakers.allow(breaker_keys)
+                if not allowed:
+                    raise CircuitOpen(open_key, job.breakers.retry_in(breaker_keys),
+                                      job.breakers.get(open_key).failed_probes)
+            connected = self.__connect_to(job, device)
+            if job.breakers is not None:
+                kind = job.connect_errors.get(hostname)
+                proxy_keys = [key for key in breaker_keys if key[0] == 'proxy']
+                group_keys = [key for key in breaker_keys if key[0] != 'proxy']
+                if kind in PROXY_KINDS:  # proxy failed, the device was never reached
+                    job.breakers.record(proxy_keys, False)
+                else:
+                    if kind != 'negotiation_timeout':  # proxy gave a socket or reported on the device
+                        job.breakers.record(proxy_keys, True)
+                    job.breakers.record(group_keys, bool(connected))  # login/ssh outcomes are the device's
+        if not connected:
+            return False
+        with job.state_lock:
+            expired = hostname in job.expired
+            if not expired:
+                job.active_sessions[hostname] = connected
+                job.session_keys[hostname] = key
+        if expired:  # budget ran out while connecting
+            connected.disconnect()
+            return False
+        if job.hooks is not None:
+            job.hooks.emit('on_connect', hostname)
+        if job.tuning.get(device.get_type(), SAFE_PROFILE).get('expect_prompt'):
+            try:  # one prompt lookup per session instead of one per command
+                options = {'expect_string': re.escape(connected.find_prompt().strip())}
+                with job.state_lock:
+                    job.send_options[hostname] = options
+            except Exception as error:
+                logging.error('Prompt lookup failed for %s, using netmiko default - %s', hostname, error)
+        return connected
+
+    @classmethod
+    def __run_shows(self, job, connection, device: Device, shows: list):
+        """run shows on an open session, errors are logged instead of raised
+
+        With a fingerprint cache, gated shows are taken from cache when the
+        fingerprint command output did not change.
+
+        Args:
+            job (Job): state of the collection run
+            connection (netmiko object): established connection to device
+            device (class object): Device subclass object
+            shows (list): show commands to run
+
+        Returns:
+            list: list of {show: output}, None if collection failed
+        """
+        hostname = device.get_hostname()
+        gated = []
+        command = None
+        if job.fingerprints is not None:
+            gated = [show for show in shows if show in job.gated_list]
+            command = job.fingerprints.command(device.get_type())
+        try:
+            if len(gated) == 0 or command is None:
+                return self.__get_outputs(job, connection, hostname, shows, os_type=device.get_type())
+            options = job.send_options.get(hostname, {})
+            fingerprint = normalize(connection.send_command(command, read_timeout=30, **options))
+            if not usable(fingerprint):
+                logging.warning('Fingerprint of %s empty or rejected, collecting all outputs', hostname)
+                return self.__get_outputs(job, connection, hostname, shows, os_type=device.get_type())
+            cached = job.fingerprints.lookup(hostname, fingerprint, gated)
+            if cached is not None:
+                logging.info('Fingerprint unchanged for %s, using cached outputs', hostname)
+                outputs = self.__get_outputs(job, connection, hostname, [show for show in shows if show not in gated],
+                                             os_type=device.get_type())
+                outputs += cached
+                if job.hooks is not None:
+                    for pair in cached:
+                        job.hooks.emit('on_command_output', hostname, *next(iter(pair.items())))
+                position = {show: i for i, show in enumerate(shows)}
+                outputs.sort(key=lambda pair: position[next(iter(pair))])
+                return outputs
+            outputs = self.__get_outputs(job, connection, hostname, shows, os_type=device.get_type())
+            if hostname not in job.expired and len(outputs) == len(shows):  # only cache complete runs
+                job.fingerprints.update(hostname, fingerprint, [pair for pair in outputs if next(iter(pair)) in gated])
+            return outputs
+        except Exception as error:
+            if hostname not in job.expired:  # else session was closed by deadline
+                logging.error('Failed collecting outputs from %s - %s', hostname, error)
+            return None
+
+    @classmethod
+    def __finish(self, job, hostname: str, output, status: str = 'not_connected') -> None:
+        """store device result and close its session, ignored if the device already expired
+
+        Args:
+            job (Job): state of the collection run
+            hostname (str): device name
+            output (list): list of {show: output}, None if device failed
+            status (str, optional): failure status, 'not_connected', 'push_failed' or 'circuit_open'.
+                                    Defaults to 'not_connected'.
+        """
+        stored = output
+        if output is not None and job.store is not None:  # shared line table, hooks still get plain strings
+            stored = [{show: job.store.intern(text) for show, text in pair.items()} for pair in output]
+        with job.state_lock:
+            if hostname in job.expired:
+                return
+            job.finished.add(hostname)
+            job.partial.pop(hostname, None)
+            session = job.active_sessions.pop(hostname, None)
+            key = job.session_keys.pop(hostname, None)
+            job.send_options.pop(hostname, None)
+            if output is None:
+                failed = {'push_failed': job.push_failed, 'circuit_open': job.circuit_open}
+                failed.get(status, job.non_connected).append(hostname)
+            else:
+                job.main_dict[hostname] = stored # add output(s) to device dict
+        if session:
+            if output is not None and job.session_pool is not None:  # keep healthy session warm
+                job.session_pool.checkin(key, session)
+            else:
+                session.disconnect()
+        if job.budget is not None:
+            if output is None:
+                job.budget.release(hostname)
+            else:
+                self.__spill(job, job.budget.complete(hostname, outputs_size(stored)))
+        if output is not None and job.output_index is not None:  # indexes the stored outputs, not copies
+            job.output_index.on_device_done(hostname, stored)
+        if job.hooks is not None:
+            if output is None:
+                job.hooks.emit('on_failure', hostname, status)
+            else:
+                job.hooks.emit('on_device_done', hostname, output)
+
+    @classmethod
+    def __spill(self, job, victims: list) -> None:
+        """move outputs of completed devices from main_dict to disk
+
+        Args:
+            job (Job): state of the collection run
+            victims (list): hostnames chosen by the memory budget
+        """
+        for hostname in victims:
+            with job.state_lock:
+                outputs = job.main_dict.get(hostname)
+            if not isinstance(outputs, list):
+                continue
+            spilled = job.budget.spill(outputs)  # file written outside the lock
+            with job.state_lock:
+                job.main_dict[hostname] = spilled
+            logging.info('Memory budget reached, outputs of %s spilled to %s', hostname, spilled.filename)
+
+    @classmethod
+    def __close_device(self, job, device: Device, timer, started: float) -> None:
+        """stop device budget timer and record device duration
+
+        Args:
+            job (Job): state of the collection run
+            device (class object): Device subclass object
+            timer (threading.Timer): budget timer, None if no budget
+            started (float): time.monotonic() when device started
+        """
+        if timer:
+            timer.cancel()
+        if job.history is not None:
+            job.history.record(device.get_hostname(), device.get_type(), time.monotonic() - started)
+
+    @classmethod
+    def __wrapper_output(self, job, device: Device, budget: float = None) -> None:
         """wrapper function to connect and get output from device
 
+        When heavy commands are set, only light commands run here and the session
+        is handed to the heavy lane.
+
         Args:
+            job (Job): state of the collection run
             device (class object): Device subclass object
+            budget (float, optional): wall-clock seconds allowed for this device. Defaults to device_timeout.
         """
-        connected = self.__connect_to(device)
-        if connected:
-            output = self.__get_outputs(connected)
-            self.main_dict[device.get_hostname()] = output # add output(s) to device dict
-        else:
-            self.non_connected.append(device.get_hostname())
+        hostname = device.get_hostname()
+        if job.budget is not None:  # backpressure, wait for in-flight outputs to finish
+            job.budget.wait_for_room()
+        if hostname in job.expired:  # job deadline reached before device was started
+            return
+        if budget is None:
+            budget = job.device_timeout
+        started = time.monotonic()
+        timer = None
+        if budget is not None:
+            timer = threading.Timer(budget, self.__expire, (job, hostname))
+            timer.daemon = True
+            timer.start()
+        handed_off = False
+        try:
+            try:
+                connected = self.__open_session(job, device)
+            except CircuitOpen as error:
+                deferred = job.deferred.get(hostname)
+                if deferred is not None and deferred[0] == error.key and error.failed_probes > deferred[1]:
+                    logging.error('%s, probe failed while deferred, failing %s', error, hostname)
+                    self.__finish(job, hostname, None, 'circuit_open')
+                elif job.breaker_mode == 'defer' and job.pool is not None:  # retry once a probe may go through
+                    if deferred is None or deferred[0] != error.key:
+                        job.deferred[hostname] = (error.key, error.failed_probes)
+                    logging.info('%s for %s, deferring %.1fs', error, hostname, error.retry_in)
+                    job.lane_results.append((device, DeferredTask(max(error.retry_in, 0.1), job.pool,
+                                                                  self.__task(job, self.__wrapper_output),
+                                                                  (job, device))))
+                    if timer:
+                        timer.cancel()  # budget restarts with the deferred attempt
+                    handed_off = True  # not a real attempt, no duration recorded
+                else:
+                    logging.error('%s, failing %s', error, hostname)
+                    self.__finish(job, hostname, None, 'circuit_open')
+                return
+            if not connected:
+                self.__finish(job, hostname, None)
+                return
+            if job.heavy_pool is None or len(self.__device_shows(job, device, 'heavy')) == 0:  # single lane
+                self.__finish(job, hostname, self.__run_shows(job, connected, device, self.__device_shows(job, device)))
+                return
+            output = self.__run_shows(job, connected, device, self.__device_shows(job, device, 'light'))
+            if output is None:
+                self.__finish(job, hostname, None)
+                return
+            with job.state_lock:
+                if hostname in job.expired:
+                    return
+                job.partial[hostname] = output
+            if job.light_callback is not None:
+                try:
+                    job.light_callback(hostname, output)
+                except Exception as error:
+                    logging.error('light_callback failed for %s - %s', hostname, error)
+            if not job.heavy_backlog.acquire(blocking=False):  # too many idle sessions, heavy lane reconnects
+                with job.state_lock:
+                    session = job.active_sessions.pop(hostname, None)
+                if session:
+                    session.disconnect()
+                connected = False
+            result = job.heavy_pool.apply_async(self.__task(job, self.__wrapper_heavy),
+                                                (job, device, connected, timer, started))
+            job.lane_results.append((device, result))
+            handed_off = True
+        finally:
+            if not handed_off:
+                self.__close_device(job, device, timer, started)
+
+    @classmethod
+    def __wrapper_heavy(self, job, device: Device, connection, timer, started: float) -> None:
+        """heavy lane routine, runs heavy commands and merges them with light outputs
+
+        Args:
+            job (Job): state of the collection run
+            device (class object): Device subclass object
+            connection (netmiko object): session handed by light lane, False to reconnect
+            timer (threading.Timer): device budget timer, None if no budget
+            started (float): time.monotonic() when device started
+        """
+        hostname = device.get_hostname()
+        if connection:
+            job.heavy_backlog.release()
+        try:
+            if hostname in job.expired:
+                return
+            if not connection:
+                try:
+                    connection = self.__open_session(job, device)
+                except CircuitOpen as error:
+                    logging.error('%s, failing %s', error, hostname)
+                    self.__finish(job, hostname, None, 'circuit_open')
+                    return
+                if not connection:
+                    self.__finish(job, hostname, None)
+                    return
+            output = self.__run_shows(job, connection, device, self.__device_shows(job, device, 'heavy'))
+            if output is not None:
+                with job.state_lock:
+                    output = job.partial.get(hostname, []) + output
+                position = {show: i for i, show in enumerate(self.__device_shows(job, device))}
+                output.sort(key=lambda pair: position[next(iter(pair))])  # back to show_list order
+            self.__finish(job, hostname, output)
+        finally:
+            self.__close_device(job, device, timer, started)
+
+    @classmethod
+    def __probe(self, job, sample: list, profile: dict, command: str, rounds: int):
+        """time a probe command on sample devices with a tuning profile
+
+        Args:
+            job (Job): state of the collection run
+            sample (list): list of Device class object (same os_type)
+            profile (dict): tuning profile to try
+            command (str): probe show command
+            rounds (int): times the command is sent on each device
+
+        Returns:
+            tuple: (seconds, list of stable lines of each output), None if any device failed
+        """
+        os_type = sample[0].get_type()
+        saved = job.tuning.get(os_type)
+        job.tuning[os_type] = profile
+        hooks, job.hooks = job.hooks, None  # probes are not reported to hooks
+        started = time.monotonic()
+        outputs = []
+        try:
+            for device in sample:
+                hostname = device.get_hostname()
+                connection = self.__open_session(job, device)
+                if not connection:
+                    return None
+                try:
+                    for i in range(rounds):
+                        pair = self.__get_outputs(job, connection, hostname, [command], os_type=device.get_type())[0]
+                        outputs.append(stable_lines(pair[command]))
+                finally:
+                    if job.budget is not None:
+                        job.budget.release(hostname)
+                    with job.state_lock:
+                        job.active_sessions.pop(hostname, None)
+                        job.session_keys.pop(hostname, None)
+                        job.send_options.pop(hostname, None)
+                    connection.disconnect()
+        except Exception as error:
+            logging.info('Tuning profile %s failed on %s - %s', profile, os_type, error)
+            return None
+        finally:
+            job.hooks = hooks
+            if saved is None:
+                job.tuning.pop(os_type, None)
+            else:
+                job.tuning[os_type] = saved
+        return time.monotonic() - started, outputs
+
+    @classmethod
+    def __calibrate(self, job, device: list, command: str, sample_size: int = 3, rounds: int = 2) -> dict:
+        """find the fastest stable tuning profile per os_type on a sample of devices
+
+        A candidate is stable when its probe outputs match the ones collected
+        with netmiko defaults, volatile lines (uptime, clock) left out.
+
+        Args:
+            job (Job): state of the collection run
+            device (list): list of Device class object
+            command (str/dict): probe show command, or {os_type: command}
+            sample_size (int, optional): devices probed per os_type. Defaults to 3.
+            rounds (int, optional): times the probe is sent per device. Defaults to 2.
+
+        Returns:
+            dict: {os_type: profile}
+        """
+        by_type = {}
+        for dev in device:
+            by_type.setdefault(dev.get_type(), []).append(dev)
+        profiles = {}
+        for os_type, devices in by_type.items():
+            sample = devices[:sample_size]
+            probe = command.get(os_type) if isinstance(command, dict) else command
+            if probe is None:
+                continue
+            baseline = self.__probe(job, sample, SAFE_PROFILE, probe, rounds)
+            if baseline is None:
+                logging.error('Calibration baseline failed for %s, using netmiko defaults', os_type)
+                continue
+            if not any(baseline[1]):  # nothing left to tell a truncated read apart
+                logging.error('Calibration probe %s of %s has no stable lines, using netmiko defaults', probe, os_type)
+                continue
+            best, best_time = SAFE_PROFILE, baseline[0]
+            for candidate in CANDIDATES:
+                result = self.__probe(job, sample, candidate, probe, rounds)
+                if result is not None and result[1] == baseline[1] and result[0] < best_time:
+                    best, best_time = candidate, result[0]
+            logging.info('Calibrated %s: %s (%.2fs vs %.2fs default)', os_type, best, best_time, baseline[0])
+            profiles[os_type] = best
+        return profiles
+
+    @staticmethod
+    def __task(job, func):
+        """routine to run for a pool task, profiled when the job has a profiler
+
+        Args:
+            job (Job): state of the collection run
+            func (callable): task routine
+
+        Returns:
+            callable: func or its profiled wrapper
+        """
+        if job.profiler is None:
+            return func
+        return job.profiler.wrap(func)
 
     @classmethod
-    def __pool_connection(self, max_threads: int, device: list) -> None:
+    def __pool_connection(self,
+                          job,
+                          max_threads: int,
+                          device: list,
+                          job_timeout: float = None,
+                          heavy_threads: int = 1) -> None:
         """Handles multithreading operations
 
         Args:
+            job (Job): state of the collection run
             max_threads (int): max amount of working threads
             device (list): list of Device class object
+            job_timeout (float, optional): wall-clock seconds allowed for the whole job. Defaults to None.
+            heavy_threads (int, optional): working threads for heavy commands lane. Defaults to 1.
         """
-        pool = Pool(max_threads)
-        try:
-            logging.info('Starting Multithread operations')
-            pool.map(self.__wrapper_output, device)
-        except UnboundLocalError:
-            logging.error('Error mapping threads to routine')
-
-        pool.close()
-        pool.join()
+        if job.thread_pool is not None:  # pool owned by caller, not closed here
+            pool = job.thread_pool
+        else:
+            pool = Pool(max_threads)
+        if len(job.heavy_list) > 0:
+            job.heavy_pool = Pool(heavy_threads)
+        pools = [p for p in (pool, job.heavy_pool) if p is not None and p is not job.thread_pool]
+        deadline = None
+        if job_timeout is not None:
+            deadline = time.monotonic() + job_timeout
+        job.pool = pool
+        logging.info('Starting Multithread operations')
+        routine = self.__task(job, self.__wrapper_output)
+        job.lane_results = [(dev, pool.apply_async(routine, (job, dev))) for dev in device]
+        index = 0
+        while index < len(job.lane_results):  # heavy lane results are appended while waiting
+            dev, result = job.lane_results[index]
+            remaining = None
+            if deadline is not None:
+                remaining = max(0, deadline - time.monotonic())
+            result.wait(remaining)
+            if not result.ready():
+                break
+            index += 1
+        pending = [dev for dev, result in job.lane_results if not result.ready()]
+        if pending:
+            logging.error(f'Job deadline reached, cancelling {len(pending)} device(s)')
+            for dev in pending:
+                self.__expire(job, dev.get_hostname())
+            for p in pools:
+                p.terminate()  # worker threads can't be killed, late results are discarded
+        else:
+            for dev, result in job.lane_results:
+                try:
+                    result.get()
+                except UnboundLocalError:
+                    logging.error('Error mapping threads to routine')
+            for p in pools:
+                p.close()
+                p.join()
+        job.heavy_pool = None
 
         logging.info('Finished Multithread operations')
         return
@@ -212,84 +1002,446 @@ class MultiThreadConnector:
     def output_collector(self,
                          devices,
                          shows,
-                         loglevel: str = 'error',
+                         loglevel: str = None,
                          max_threads: int = 12,
                          user: str = '',
                          paswd: str = '',
                          os_type: str = 'cisco_xr',
                          log_filename: str = None,
                          socks_proxy: list = None,
+                         job_timeout: float = None,
+                         device_timeout: float = None,
+                         history_file: str = None,
+                         heavy_shows: list = None,
+                         heavy_threads: int = None,
+                         heavy_backlog: int = None,
+                         light_callback=None,
+                         session_pool=None,
+                         thread_pool=None,
+                         log_queued: bool = False,
+                         log_output_chars: int = 2000,
+                         log_sample_rate: float = 1.0,
+                         fingerprint_cache: str = None,
+                         fingerprint_commands: dict = None,
+                         gated_shows: list = None,
+                         tuning=None,
+                         tuning_file: str = None,
+                         calibration_sample: int = 3,
+                         calibration_command: str = None,
+                         hooks=None,
+                         hooks_workers: int = None,
+                         sink=None,
+                         memory_budget: int = None,
+                         spill_dir: str = None,
+                         breaker_threshold: int = None,
+                         breaker_reset: float = 30,
+                         breaker_mode: str = 'fail',
+                         device_groups=None,
+                         dns_cache=None,
+                         resume: str = None,
+                         adaptive_timeout: bool = False,
+                         progress=None,
+                         progress_interval: float = 10,
+                         profile: str = None,
+                         profile_file: str = None,
+                         output_store=None,
+                         output_index=None,
+                         connect_timeout: float = 10,
+                         negotiation_timeout: float = 10,
+                         socket_profile=None,
                          ) -> dict:
         """Connect in parallel to multiple devices and returns estrucutred outputs
 
         Args:
             devices (str/dict/list): device(s) to connect to. Supports str for single device and list/dict for multiple devices
-                                     list: list of ipaddress
-                                     dict: {hostname: ipadress}
-            shows (str/list): show commands to execute in each device. Supports str for single show or list for multiple commands
-            loglevel (str, optional): sets the logging level. Defaults to 'error'.
+                                     list: list of ipaddress or hostname
+                                     dict: {hostname: ipadress or resolvable name}
+                                           or {hostname: {'ip': ..., 'os_type': ..., 'group': ...}} for mixed fleets
+            shows (str/list/dict): show commands to execute in each device. Supports str for single show or list for
+                                   multiple commands. dict maps a device group, os_type or 'default' to its own
+                                   commands, each device gets the set of its group, else of its os_type, else
+                                   'default'; devices with no set are skipped
+            loglevel (str, optional): sets the logging level. Defaults to None (keep current logging
+                                      configuration, ERROR to stderr if none).
             max_threads (int, optional): max number of working threads. Defaults to 12.
             user (str, optional): username to access devices. Defaults to ''.
             paswd (str, optional): password for username. Defaults to ''.
             os_type (str, optional): netmiko device_type. Defaults to 'cisco_xr'.
             log_filename (str, optional): set a file to save logs. Defaults to None.
             socks_proxy (tuple, optional): ip,port tuplet for socks5 connection. Default empty
+            job_timeout (float, optional): seconds allowed for the whole job, devices still running are cancelled
+                                           and listed under 'deadline'. Defaults to None (no limit).
+            device_timeout (float, optional): seconds allowed for each device (connect + all shows). Defaults to None.
+            history_file (str/DurationHistory, optional): json file (or DurationHistory) keeping device durations
+                                                          between runs, devices are started longest expected first.
+                                                          Defaults to None (input order).
+            heavy_shows (list, optional): shows (from shows) run in a separate heavy lane after all light shows
+                                          of the device, so light outputs are not held by heavy ones. Defaults to None.
+            heavy_threads (int, optional): working threads of heavy lane. Defaults to max_threads // 4 (min 1).
+            heavy_backlog (int, optional): max open sessions waiting for heavy lane, extra devices reconnect
+                                           in heavy lane. Defaults to 2 * heavy_threads.
+            light_callback (callable, optional): called as light_callback(hostname, outputs) as soon as light
+                                                 shows of a device finished (heavy lane only). Defaults to None.
+            session_pool (SessionPool, optional): warm sessions reused and returned after collection. Defaults to None.
+            thread_pool (Pool, optional): long-lived worker pool used instead of a new one. Defaults to None.
+            log_queued (bool, optional): write logs from a QueueListener thread instead of workers. Defaults to False.
+            log_output_chars (int, optional): max chars of each output logged at DEBUG, 0 no bodies,
+                                              None full bodies. Defaults to 2000.
+            log_sample_rate (float, optional): fraction of outputs whose body is logged at DEBUG. Defaults to 1.0.
+            fingerprint_cache (str, optional): json file of fingerprints and outputs. When set, each device first
+                                               runs a cheap fingerprint command and gated_shows are returned
+                                               from cache if it did not change. Empty or rejected fingerprints
+                                               always collect. Defaults to None.
+            fingerprint_commands (dict, optional): {os_type: command} overriding default fingerprint commands,
+                                                   os types without command are always collected. Defaults to None.
+            gated_shows (list, optional): shows (from shows) served from fingerprint cache, only those whose
+                                          output changes with the configuration alone. Defaults to None
+                                          (configuration shows: show running-config/configuration/startup).
+            tuning (str/dict, optional): session tuning per os_type. None: netmiko defaults (or tuning_file
+                                         if it exists), 'default': built-in TUNING_PROFILES, 'auto': calibrate
+                                         on a sample of devices first, dict: {os_type: profile}. Defaults to None.
+            tuning_file (str, optional): json file with calibrated profiles, written when tuning='auto'.
+                                         Defaults to None.
+            calibration_sample (int, optional): devices per os_type probed when tuning='auto'. Defaults to 3.
+            calibration_command (str, optional): probe command for calibration, outputs are compared without
+                                                 uptime/clock lines. Defaults to first show of each os_type.
+            hooks (Hooks/dict, optional): event callbacks (on_connect, on_command_output, on_device_done,
+                                          on_failure) as a Hooks object or {event: callable}. Defaults to None.
+            hooks_workers (int, optional): run callbacks given as dict on an executor with this many threads,
+                                           the job returns once they all ran. Defaults to None (inline).
+            sink (SQLiteSink, optional): result sink written while collecting, one run per job. Defaults to None.
+            memory_budget (int, optional): approx. size (characters) of outputs kept in memory. New devices wait
+                                           while in-flight outputs fill it and completed outputs are spilled to
+                                           spill_dir (returned as SpilledOutputs). Defaults to None (no limit).
+            spill_dir (str, optional): directory for spilled outputs. Defaults to a temporary directory.
+            breaker_threshold (int, optional): consecutive connection failures through the socks proxy or inside
+                                               a device group that open its circuit breaker. Defaults to None (off).
+            breaker_reset (float, optional): seconds a breaker stays open before a half-open probe. Defaults to 30.
+            breaker_mode (str, optional): 'fail': devices behind an open breaker are listed under 'circuit_open'
+                                          right away, 'defer': they are retried after the half-open probe, and
+                                          listed under 'circuit_open' if that probe failed. Defaults to 'fail'.
+            device_groups (dict/callable, optional): {hostname: group} or callable(Device) -> group (e.g. site)
+                                                     for breakers. Defaults to None (group set in devices).
+            dns_cache (str/DNSCache, optional): json file or DNSCache keeping resolved hostnames between runs.
+                                                With socks_proxy, hostnames are resolved by the proxy instead
+                                                (remote DNS). Defaults to None (cache kept for this job only).
+            resume (str, optional): checkpoint journal file. Each completed device is recorded with its outputs
+                                    as results arrive; devices already in the journal are not collected again
+                                    and their outputs are returned from disk (SpilledOutputs). A journal of
+                                    other devices/shows, or of a job that finished with no device left, is
+                                    started over. Defaults to None.
+            adaptive_timeout (bool, optional): learn command durations in history_file and set each command
+                                               read_timeout to p99 * margin, within floor and ceiling (see
+                                               DurationHistory). Defaults to False (30 seconds).
+            progress (bool/callable/Progress, optional): live progress every progress_interval: True logs a line
+                                                         at INFO, a callable also gets each snapshot (done, failed,
+                                                         in flight, rate, ETA, slowest sessions). Defaults to None.
+            progress_interval (float, optional): seconds between progress reports. Defaults to 10.
+            profile (str, optional): profile the collection, 'cprofile': stats of all workers merged into a
+                                     pstats file, 'sample': stack sampling of all threads written as collapsed
+                                     stacks. Defaults to None.
+            profile_file (str, optional): profiler output file. Defaults to mtcollector-<time>-<pid>.pstats
+                                          (or .collapsed) in the working directory.
+            output_store (LineStore, optional): deduplicated line table, outputs are returned as InternedOutput
+                                                (rebuilt to str on access). Reuse the same store across runs
+                                                to share lines between them. Defaults to None (plain str).
+            output_index (OutputIndex, optional): n-gram index filled with each (device, command) output as
+                                                  devices finish, for fast substring/regex search; keep it with
+                                                  the results using OutputIndex.save(). Defaults to None.
+            connect_timeout (float, optional): seconds allowed for the TCP connect to the socks proxy (or to the
+                                               device when socket_profile is set). Defaults to 10.
+            negotiation_timeout (float, optional): seconds allowed for each step of the socks negotiation, which
+                                                   includes the proxy connecting to the device. A timeout waiting
+                                                   for the CONNECT reply counts against the device group breaker
+                                                   only, earlier steps against the proxy. Defaults to 10.
+            socket_profile (str/dict, optional): socket options set on proxied and direct sockets, a name from
+                                                 SOCKET_PROFILES ('interactive', 'bulk') or a dict (nodelay,
+                                                 keepalive, keepidle, keepintvl, keepcnt, rcvbuf, sndbuf).
+                                                 Defaults to None (system defaults, netmiko opens direct sockets).
 
         Raises:
             TypeError: if device/show VAR are not supported
-            ValueError: if device ipaddress not in range
+            ValueError: if device ipaddress not in range, adaptive_timeout set without history_file
+                        or profile mode not supported
 
         Returns:
             dict: dict of devices and outputs = {device1: [{cmd1: ouput1}, {cmd2: output2}]}
+                  failed devices are listed under 'not_connected', cancelled ones under 'deadline'
         """
-        if socks_proxy is None:
-            socks_proxy = []
-        self.username = user
-        self.password = paswd
-        self.show_list = []
+        show_list = []
+        command_sets = None
         if type(shows) == str:  # check for shows type
-            self.show_list.append(shows)
+            show_list.append(shows)
         elif type(shows) == list:
-            self.show_list = shows.copy()
+            show_list = shows.copy()
+        elif type(shows) == dict:  # {group/os_type/'default': shows}, show_list holds all of them
+            command_sets = {key: [value] if type(value) == str else list(value) for key, value in shows.items()}
+            show_list = list(dict.fromkeys(show for commands in command_sets.values() for show in commands))
         else:
-            logging.error('VAR shows out of type, supports str or list')
+            logging.error('VAR shows out of type, supports str, list or dict')
             logging.debug(f'VAR shows out of type --\nValue: {shows}')
-            raise TypeError('VAR shows out of type, supports str or list')
-        self.main_dict = {}
-        self.non_connected = []
-        self.socks_proxy = socks_proxy
-        log_level = getattr(logging, loglevel.upper())  # getting attribute based on input
-        logging.basicConfig(format='%(asctime)s,%(msecs)03d %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s',
-                            datefmt='%Y-%m-%d:%H:%M:%S',
-                            level=log_level, filename=log_filename)
-        device_list = []
-        if type(devices) == dict:   # expected value for dict {hostname: ipaddress}
-            for hostname in devices.keys():
-                if self.__check_ipaddress(devices[hostname]):  # check if value ipaddress
-                    device = self.Device(hostname, devices[hostname], os_type)
-                    device_list.append(device)
-        elif type(devices) == list:
-            for i in devices:
-                if self.__check_ipaddress(i):   # check if value is ipaddress
-                    a = self.Device('', i, os_type)
-                    device_list.append(a)
-        elif type(devices) == str:  # if value not ip, Raise Value error and stop exec
+            raise TypeError('VAR shows out of type, supports str, list or dict')
+        if heavy_threads is None:
+            heavy_threads = max(1, max_threads // 4)
+        if heavy_backlog is None:
+            heavy_backlog = 2 * heavy_threads
+        history = history_file
+        if isinstance(history_file, str):
+            history = DurationHistory(history_file)
+        if adaptive_timeout and history is None:
+            raise ValueError('adaptive_timeout requires history_file')
+        profiler = None
+        if profile is not None:
+            profiler = Profiler(profile, profile_file)
+        fingerprints = None
+        if fingerprint_cache is not None:
+            fingerprints = FingerprintCache(fingerprint_cache, fingerprint_commands)
+        if tuning == 'default':
+            profiles = dict(TUNING_PROFILES)
+        elif isinstance(tuning, dict):
+            profiles = dict(tuning)
+        elif tuning is None and tuning_file is not None:
+            profiles = load_profiles(tuning_file)
+        else:  # 'auto', filled by calibration once devices are known
+            profiles = {}
+        own_hooks = isinstance(hooks, dict)
+        if own_hooks:
+            hooks = Hooks(max_workers=hooks_workers, **hooks)
+        job_hooks = hooks
+        run_id = None
+        if sink is not None:
+            run_id = sink.begin_run()  # per job, a sink can be shared by concurrent jobs
+            job_hooks = HookChain(hooks, sink.run_hooks(run_id))
+        journal = None
+        if resume is not None:
+            journal = Journal(resume, job_digest(devices, shows))
+            job_hooks = HookChain(job_hooks, journal.hooks)
+        if progress is True:
+            progress = Progress(interval=progress_interval)
+        elif callable(progress):
+            progress = Progress(progress, progress_interval)
+        if progress:
+            job_hooks = HookChain(job_hooks, progress.hooks)
+        job = self.Job(user, paswd, show_list, heavy_shows, heavy_backlog, socks_proxy, device_timeout,
+                       history, session_pool, thread_pool, light_callback, log_output_chars, log_sample_rate,
+                       fingerprints, profiles, job_hooks, gated_shows=gated_shows)
+        job.command_sets = command_sets
+        job.connect_timeout = connect_timeout
+        job.negotiation_timeout = negotiation_timeout
+        if isinstance(socket_profile, str):
+            socket_profile = SOCKET_PROFILES[socket_profile]
+        job.socket_profile = dict(socket_profile or {})
+        job.adaptive_timeout = adaptive_timeout
+        job.profiler = profiler
+        job.store = output_store
+        job.output_index = output_index
+        if memory_budget is not None:
+            job.budget = MemoryBudget(memory_budget, spill_dir)
+        if breaker_threshold is not None:
+            job.breakers = BreakerBoard(breaker_threshold, breaker_reset, device_groups)
+            job.breaker_mode = breaker_mode
+        configure_logging(loglevel, log_filename, log_queued)  # no-op without settings or when unchanged
+        if not isinstance(dns_cache, DNSCache):
+            dns_cache = DNSCache(dns_cache)
+        resolver = None if len(job.socks_proxy) > 0 else dns_cache  # proxy resolves names itself
+        device_list = self.__device_list(devices, os_type, resolver)
+        dns_cache.save()
+        if journal is not None and len(journal.completed) > 0:
+            device_list = [device for device in device_list if device.get_hostname() not in journal.completed]
+            job.main_dict.update(journal.completed)  # previous run outputs, read from disk on access
+            logging.info('Resuming job, %d device(s) left', len(device_list))
+        if command_sets is not None:
+            for device in device_list:
+                if len(self.__device_shows(job, device)) == 0:
+                    logging.error(f'No command set for {device.get_hostname()} ({device.get_type()}), device skipped')
+            device_list = [device for device in device_list if len(self.__device_shows(job, device)) > 0]
+        if type(devices) == str:
             max_threads = 1  # if single device set single working thread
-        else:   # if device type not supported rise TypeError
-            logging.error(f'Argument provided not a String, List or Dict --')
-            logging.error(f'Argument type: {str(type(devices))}. Content: {devices}')
-            raise TypeError('Argument provided not list or Dict')
+        load_drivers()  # before the pool starts, so threads don't serialize on the import lock
+        if tuning == 'auto' and len(show_list) > 0:
+            sample = device_list
+            probe = calibration_command
+            if probe is None:  # first show of each os_type
+                probe = {}
+                for device in device_list:
+                    probe.setdefault(device.get_type(), self.__device_shows(job, device)[0])
+            job.tuning.update(self.__calibrate(job, sample, probe, calibration_sample))
+            if tuning_file is not None:
+                save_profiles(tuning_file, job.tuning)
+        if job.history is not None:  # LPT: slowest expected devices first
+            device_list = job.history.order(device_list)
         logging.info('Starting Pool mapping')
-        if max_threads > 1:  # if single thread don't use multithread function
-            self.__pool_connection(max_threads, device_list)
-        else:
-            a = self.Device('', devices, os_type)
-            self.__wrapper_output(a)
+        if progress:
+            progress.start(len(device_list))
+        if job.profiler is not None:
+            job.profiler.start()
+        try:
+            if max_threads > 1 or len(device_list) > 1:  # pool of max_threads, only a single device skips it
+                self.__pool_connection(job, max_threads, device_list, job_timeout, heavy_threads)
+            elif len(device_list) > 0:
+                budgets = [t for t in (job_timeout, device_timeout) if t is not None]
+                self.__task(job, self.__wrapper_output)(job, device_list[0], min(budgets) if budgets else None)
+        finally:
+            if progress:
+                progress.stop()
+            if job.profiler is not None:
+                job.profiler.stop()
         logging.info('Ended pool mapping')
-        if len(self.non_connected) > 0:  # if any device in non_connected, append to dict
-            self.main_dict['not_connected'] = self.non_connected
-        logging.debug(f'Returning data: \n{self.main_dict}')
-        return self.main_dict
+        with job.state_lock:
+            if len(job.non_connected) > 0:  # if any device in non_connected, append to dict
+                job.main_dict['not_connected'] = job.non_connected
+            if len(job.deadline) > 0:  # devices cancelled by job/device deadline
+                job.main_dict['deadline'] = job.deadline
+            if len(job.circuit_open) > 0:  # devices failed fast by an open breaker
+                job.main_dict['circuit_open'] = job.circuit_open
+        if job.history is not None:
+            job.history.save()
+        if job.fingerprints is not None:
+            job.fingerprints.save()
+        if own_hooks:
+            hooks.close()
+        if sink is not None:
+            sink.end_run(run_id)
+        if journal is not None:  # complete journals are started over by the next run
+            journal.close(complete=len(job.non_connected) + len(job.deadline) + len(job.circuit_open) == 0)
+        logging.debug('Returning data for %d device(s)', len(job.main_dict))
+        return job.main_dict
+
+    @classmethod
+    def __wrapper_config(self, job, device: Device, config_set: list, commit: bool, save: bool,
+                         error_pattern: str = None) -> bool:
+        """push configuration to a single device
+
+        Args:
+            job (Job): state of the push run
+            device (class object): Device subclass object
+            config_set (list): configuration commands
+            commit (bool): commit candidate configuration (XR/Junos style platforms)
+            save (bool): save running configuration (IOS style platforms)
+            error_pattern (str, optional): regex that marks a config command as failed. Defaults to None.
+
+        Returns:
+            bool: True if configuration was applied
+        """
+        hostname = device.get_hostname()
+        connected = self.__open_session(job, device)
+        if not connected:
+            self.__finish(job, hostname, None)
+            return False
+        from netmiko import BaseConnection
+
+        # BaseConnection.commit only raises AttributeError, commit platforms override it
+        commit_platform = commit and type(connected).commit is not BaseConnection.commit
+        outputs = []
+        try:
+            # stay in config mode on commit platforms, leaving it with uncommitted changes discards them
+            outputs.append({'config': connected.send_config_set(config_set, exit_config_mode=not commit_platform,
+                                                                error_pattern=error_pattern)})
+            if commit_platform:
+                output = connected.commit()
+                outputs.append({'commit': output})
+                if re.search(COMMIT_ERRORS, output):
+                    raise ValueError(f'commit failed - {output.strip()}')
+                connected.exit_config_mode()
+            if save:
+                outputs.append({'save': connected.save_config()})
+        except Exception as error:
+            logging.error('Config push failed on %s - %s', hostname, error)
+            self.__finish(job, hostname, None, 'push_failed')
+            return False
+        self.__finish(job, hostname, outputs)
+        return True
+
+    @classmethod
+    def config_pusher(self,
+                      devices,
+                      config_set,
+                      waves: list = None,
+                      error_threshold: float = 0.1,
+                      wave_pause: float = 0,
+                      commit: bool = True,
+                      save: bool = False,
+                      error_pattern: str = None,
+                      loglevel: str = None,
+                      max_threads: int = 12,
+                      user: str = '',
+                      paswd: str = '',
+                      os_type: str = 'cisco_xr',
+                      log_filename: str = None,
+                      socks_proxy: list = None,
+                      tuning=None,
+                      hooks=None,
+                      ) -> dict:
+        """Push configuration in parallel using staged waves (canary first)
+
+        Devices are pushed wave by wave, each wave on the worker pool. After each wave the
+        failure rate so far is checked and the push halts if it is above error_threshold.
+
+        Args:
+            devices (str/dict/list): device(s) to push to, same format as output_collector
+            config_set (str/list): configuration command(s)
+            waves (list, optional): wave sizes, the last size repeats until all devices are done.
+                                    Defaults to [1, 5, 25, 100].
+            error_threshold (float, optional): max fraction of failed devices before halting. Defaults to 0.1.
+            wave_pause (float, optional): seconds to wait between waves. Defaults to 0.
+            commit (bool, optional): commit after config (platforms with commit). Defaults to True.
+            save (bool, optional): save running config after push (write mem). Defaults to False.
+            error_pattern (str, optional): regex in config output that marks a failure. Defaults to None.
+            loglevel (str, optional): sets the logging level. Defaults to None (keep current logging
+                                      configuration, ERROR to stderr if none).
+            max_threads (int, optional): max number of working threads. Defaults to 12.
+            user (str, optional): username to access devices. Defaults to ''.
+            paswd (str, optional): password for username. Defaults to ''.
+            os_type (str, optional): netmiko device_type. Defaults to 'cisco_xr'.
+            log_filename (str, optional): set a file to save logs. Defaults to None.
+            socks_proxy (tuple, optional): ip,port tuplet for socks5 connection. Default empty
+            tuning (str/dict, optional): 'default' or {os_type: profile}, see output_collector. Defaults to None.
+            hooks (Hooks, optional): event callbacks, on_device_done gets config/commit outputs. Defaults to None.
+
+        Raises:
+            TypeError: if device/config_set VAR are not supported
+
+        Returns:
+            dict: {device: [{'config': output}, {'commit': output}]}, failures listed under 'not_connected'
+                  and 'push_failed', devices skipped after a halt under 'not_pushed'
+        """
+        if type(config_set) == str:
+            config_set = [config_set]
+        elif type(config_set) != list:
+            raise TypeError('VAR config_set out of type, supports str or list')
+        if waves is None:
+            waves = [1, 5, 25, 100]
+        configure_logging(loglevel, log_filename)
+        profiles = dict(TUNING_PROFILES) if tuning == 'default' else dict(tuning or {})
+        job = self.Job(user, paswd, socks_proxy=socks_proxy, tuning=profiles, hooks=hooks)
+        device_list = self.__device_list(devices, os_type, None if len(job.socks_proxy) > 0 else DNSCache())
+        load_drivers()
+        pool = Pool(max_threads)
+        done = 0
+        failed = 0
+        wave = 0
+        while done < len(device_list):
+            size = waves[min(wave, len(waves) - 1)]
+            batch = device_list[done:done + size]
+            logging.info(f'Config push wave {wave + 1}: {len(batch)} device(s)')
+            results = [pool.apply_async(self.__wrapper_config, (job, dev, config_set, commit, save, error_pattern))
+                       for dev in batch]
+            failed += len([result for result in results if not result.get()])
+            done += len(batch)
+            wave += 1
+            if failed / done > error_threshold:
+                logging.error(f'Config push halted after wave {wave}: {failed}/{done} device(s) failed')
+                job.main_dict['not_pushed'] = [dev.get_hostname() for dev in device_list[done:]]
+                break
+            if wave_pause > 0 and done < len(device_list):
+                time.sleep(wave_pause)
+        pool.close()
+        pool.join()
+        if len(job.non_connected) > 0:
+            job.main_dict['not_connected'] = job.non_connected
+        if len(job.push_failed) > 0:
+            job.main_dict['push_failed'] = job.push_failed
+        return job.main_dict
 
     @staticmethod
     def single_output_unpack(output: list) -> str:
@@ -310,3 +1462,10 @@ def MTCollector(devices, shows, **kwargs) -> dict:
     output_collected = MultiThreadConnector.output_collector(devices, shows, **kwargs)
 
     return output_collected
+
+
+def MTConfigPush(devices, config_set, **kwargs) -> dict:
+    """Factory func """
+    pushed = MultiThreadConnector.config_pusher(devices, config_set, **kwargs)
+
+    return pushed
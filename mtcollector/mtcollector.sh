@@ -2,7 +2,7 @@
 
 Help()
 {
-    /Users/lrepetto/Documents/Dish_conn_handler/bin/python /Users/lrepetto/Documents/Dish_conn_handler/mtcollector/bashcollector.py -h
+    PYTHONPATH=/Users/lrepetto/Documents/Dish_conn_handler /Users/lrepetto/Documents/Dish_conn_handler/bin/python -m mtcollector.bashcollector -h
 }
 while getopts d:f:s:l:c:u:p:o:t::h option;
 do
@@ -52,5 +52,5 @@ fi
 
 #/home/lrepetto/conn_hanlder/bin/python /home/lrepetto/conn_hanlder/mtcollector/bashcollector.py $flags
 if [ "$flags" != "" ]; then
-    /Users/lrepetto/Documents/Dish_conn_handler/bin/python /Users/lrepetto/Documents/Dish_conn_handler/mtcollector/bashcollector.py $flags
+    PYTHONPATH=/Users/lrepetto/Documents/Dish_conn_handler /Users/lrepetto/Documents/Dish_conn_handler/bin/python -m mtcollector.bashcollector $flags
 fi
\ No newline at end of file
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+
+"""
+|   Socket setup for mtcollector sessions.                              |
+|   Opens direct and SOCKS5 sockets with bounded connect/negotiation    |
+|   time, applies socket option profiles and classifies failures.       |
+"""
+
+import socket
+
+
+# socket options applied before connecting (buffer sizes must be set before the handshake)
+SOCKET_PROFILES = {
+    'default': {},
+    'interactive': {'nodelay': True, 'keepalive': True, 'keepidle': 30, 'keepintvl': 10, 'keepcnt': 3},
+    'bulk': {'nodelay': True, 'keepalive': True, 'keepidle': 60, 'keepintvl': 15, 'keepcnt': 4,
+             'rcvbuf': 4 * 1024 * 1024},
+}
+
+# failure kinds, proxy_* point at the proxy, destination_* at the device,
+# negotiation_timeout (no reply to CONNECT) can be either: proxy stalled, or proxy still connecting
+# to the device; breakers count it against the device group only so dead devices do not open the
+# proxy breaker. A proxy not answering greeting/authentication is a proxy_timeout.
+PROXY_KINDS = ('proxy_unreachable', 'proxy_timeout', 'proxy_auth', 'proxy_error')
+DESTINATION_KINDS = ('destination_unreachable', 'destination_refused', 'destination_timeout')
+
+
+class ConnectError(Exception):
+    """Raised when a socket to a device could not be opened
+    """
+    def __init__(self, kind: str, address: str, error: Exception) -> None:
+        super().__init__(f'{kind} connecting to {address} - {error}')
+        self.kind = kind
+        self.address = address
+        self.error = error
+
+
+def apply_options(sock, profile: dict) -> None:
+    """set socket options of a profile, options missing on the platform are skipped
+
+    Args:
+        sock (socket): socket not connected yet
+        profile (dict): nodelay, keepalive, keepidle/keepintvl/keepcnt (seconds/probes), rcvbuf/sndbuf (bytes)
+    """
+    options = [
+        ('nodelay', socket.IPPROTO_TCP, 'TCP_NODELAY'),
+        ('keepalive', socket.SOL_SOCKET, 'SO_KEEPALIVE'),
+        ('keepidle', socket.IPPROTO_TCP, 'TCP_KEEPIDLE'),
+        ('keepidle', socket.IPPROTO_TCP, 'TCP_KEEPALIVE'),  # macOS name of TCP_KEEPIDLE
+        ('keepintvl', socket.IPPROTO_TCP, 'TCP_KEEPINTVL'),
+        ('keepcnt', socket.IPPROTO_TCP, 'TCP_KEEPCNT'),
+        ('rcvbuf', socket.SOL_SOCKET, 'SO_RCVBUF'),
+        ('sndbuf', socket.SOL_SOCKET, 'SO_SNDBUF'),
+    ]
+    for key, level, name in options:
+        if key in profile and hasattr(socket, name):
+            sock.setsockopt(level, getattr(socket, name), int(profile[key]))
+
+
+def open_direct(address: str, port: int, connect_timeout: float, profile: dict):
+    """open a TCP socket to a device
+
+    Args:
+        address (str): device ip address or hostname
+        port (int): ssh port
+        connect_timeout (float): seconds allowed for the TCP connect
+        profile (dict): socket options
+
+    Raises:
+        ConnectError: destination_* kind
+
+    Returns:
+        socket: connected socket, blocking
+    """
+    family = socket.AF_INET6 if ':' in address else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        apply_options(sock, profile)
+        sock.settimeout(connect_timeout)
+        sock.connect((address, port))
+    except socket.timeout as error:
+        sock.close()
+        raise ConnectError('destination_timeout', address, error)
+    except ConnectionRefusedError as error:
+        sock.close()
+        raise ConnectError('destination_refused', address, error)
+    except OSError as error:
+        sock.close()
+        raise ConnectError('destination_unreachable', address, error)
+    sock.settimeout(None)  # paramiko sets its own timeouts
+    return sock
+
+
+def open_proxied(proxy: list, address: str, port: int, connect_timeout: float, negotiation_timeout: float,
+                 profile: dict):
+    """open a socket to a device through a SOCKS5 proxy, hostnames are resolved by the proxy
+
+    connect_timeout bounds the TCP connect to the proxy, negotiation_timeout each read of the
+    SOCKS handshake (which includes the proxy connecting to the device). A timeout before the
+    CONNECT request is sent is proxy_timeout, after it negotiation_timeout.
+
+    Args:
+        proxy (list): ip,port of proxy
+        address (str): device ip address or hostname
+        port (int): ssh port
+        connect_timeout (float): seconds allowed for the TCP connect to the proxy
+        negotiation_timeout (float): seconds allowed for each step of the SOCKS negotiation
+        profile (dict): socket options
+
+    Raises:
+        ConnectError: proxy_* or destination_* kind
+
+    Returns:
+        socks.socksocket: connected socket, blocking
+    """
+    import socks
+
+    def bounded(negotiate):
+        def negotiate_with_timeout(sock, dest_addr, dest_port):
+            socket.socket.settimeout(sock, negotiation_timeout)  # raw socket, socksocket keeps connect timeout
+            return negotiate(sock, dest_addr, dest_port)
+        return negotiate_with_timeout
+
+    requested = []  # set once the CONNECT request is written, the proxy answered greeting and auth
+
+    def marked(write_address):
+        def write_address_marked(addr, file):
+            requested.append(True)
+            return write_address(addr, file)
+        return write_address_marked
+
+    sock = socks.socksocket()
+    sock.set_proxy(proxy_type=socks.SOCKS5, addr=proxy[0], port=int(proxy[1]), rdns=True)
+    # instance attributes shadow the class table PySocks uses to pick the negotiation routine,
+    # and the method writing the CONNECT address (last step before waiting for the device)
+    sock._proxy_negotiators = {kind: bounded(negotiate) for kind, negotiate in sock._proxy_negotiators.items()}
+    sock._write_SOCKS5_address = marked(sock._write_SOCKS5_address)
+    apply_options(sock, profile)
+    sock.settimeout(connect_timeout)
+    proxy_name = f'{proxy[0]}:{proxy[1]}'
+    connected = False
+    try:
+        sock.connect((address, port))
+        connected = True
+    except socks.ProxyConnectionError as error:
+        kind = 'proxy_timeout' if isinstance(error.socket_err, socket.timeout) else 'proxy_unreachable'
+        raise ConnectError(kind, proxy_name, error)
+    except (socks.ProxyError, OSError) as error:
+        cause = getattr(error, 'socket_err', None) or error  # PySocks wraps handshake errors
+        if isinstance(cause, socks.SOCKS5AuthError):
+            raise ConnectError('proxy_auth', proxy_name, error)
+        if isinstance(cause, socks.SOCKS5Error):
+            # replies 0x03-0x06: network/host unreachable, refused by device, TTL expired; others are proxy side
+            kinds = {'0x03': 'destination_unreachable', '0x04': 'destination_unreachable',
+                     '0x05': 'destination_refused', '0x06': 'destination_timeout'}
+            raise ConnectError(kinds.get(str(cause)[:4], 'proxy_error'), address, error)
+        if isinstance(cause, socket.timeout):
+            if len(requested) > 0:  # waiting for CONNECT reply, proxy may still be connecting to the device
+                raise ConnectError('negotiation_timeout', address, error)
+            raise ConnectError('proxy_timeout', proxy_name, error)  # greeting or auth not answered
+        raise ConnectError('proxy_error', proxy_name, error)
+    finally:
+        if not connected:
+            sock.close()
+    sock.settimeout(None)  # paramiko sets its own timeouts
+    return sock
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+
+"""
+|   Periodic polling mode for mtcollector.                              |
+|   Collects the same devices/shows every interval (with jitter),       |
+|   keeps sessions warm between cycles and emits only changed outputs.  |
+"""
+
+import hashlib
+import logging
+import random
+import threading
+import time
+from multiprocessing.dummy import Pool
+from .sessions import SessionPool
+
+
+STATUS_KEYS = ('not_connected', 'deadline', 'circuit_open')
+
+
+class Poller:
+    """Polls devices periodically, emitting commands whose output changed
+    """
+    def __init__(self,
+                 devices,
+                 shows,
+                 interval: float = 300,
+                 jitter: float = 0.1,
+                 max_threads: int = 12,
+                 callback=None,
+                 emit_initial: bool = True,
+                 **kwargs) -> None:
+        """main init for poller
+
+        Args:
+            devices (list/dict): list of ipaddress or {hostname: ipaddress}
+            shows (str/list): show commands to execute in each device
+            interval (float, optional): seconds between polls of a device. Defaults to 300.
+            jitter (float, optional): +/- fraction of interval added per device and cycle. Defaults to 0.1.
+            max_threads (int, optional): working threads kept between cycles. Defaults to 12.
+            callback (callable, optional): called with the changes of each cycle. Defaults to None.
+            emit_initial (bool, optional): first poll of a device emits all outputs. Defaults to True.
+            **kwargs: MTCollector arguments (user, paswd, os_type...)
+        """
+        if isinstance(devices, dict):
+            self.devices = dict(devices)
+            self.keyed = True
+        elif isinstance(devices, list):
+            self.devices = {ip: ip for ip in devices}
+            self.keyed = False
+        else:
+            raise TypeError('Argument provided not list or Dict')
+        self.shows = shows
+        self.interval = interval
+        self.jitter = jitter
+        self.callback = callback
+        self.emit_initial = emit_initial
+        self.kwargs = kwargs
+        self.kwargs['max_threads'] = max_threads
+        self.session_pool = SessionPool(idle_timeout=interval * (2 + jitter))
+        self.thread_pool = Pool(max_threads)
+        self.digests = {}  # {device: {show: digest}} of last emitted outputs
+        self.stopped = threading.Event()
+        now = time.monotonic()
+        self.next_due = {device: now + random.uniform(0, interval * jitter) for device in self.devices}
+
+    def __subset(self, keys: list):
+        """build MTCollector devices argument for keys, keeping input type
+
+        Args:
+            keys (list): device keys
+
+        Returns:
+            list/dict: devices in the format given to Poller
+        """
+        if self.keyed:
+            return {key: self.devices[key] for key in keys}
+        return list(keys)
+
+    def __diff(self, result: dict) -> dict:
+        """keep only outputs that changed since last cycle
+
+        Args:
+            result (dict): MTCollector result
+
+        Returns:
+            dict: {device: [{show: output}]} of changed outputs plus status lists
+        """
+        changes = {}
+        for device, outputs in result.items():
+            if device in STATUS_KEYS:
+                changes[device] = outputs
+                continue
+            known = device in self.digests
+            previous = self.digests.setdefault(device, {})
+            changed = []
+            for pair in outputs:
+                for show, output in pair.items():
+                    digest = hashlib.blake2b(output.encode(), digest_size=16).digest()
+                    if previous.get(show) != digest:
+                        previous[show] = digest
+                        if known or self.emit_initial:
+                            changed.append({show: output})
+            if len(changed) > 0:
+                changes[device] = changed
+        return changes
+
+    def poll_once(self, keys: list = None) -> dict:
+        """poll devices now and return changed outputs
+
+        Args:
+            keys (list, optional): devices to poll. Defaults to all devices.
+
+        Returns:
+            dict: {device: [{show: output}]} of changed outputs plus status lists
+        """
+        from .mtcollector import MTCollector
+
+        if keys is None:
+            keys = list(self.devices)
+        result = MTCollector(self.__subset(keys), self.shows, session_pool=self.session_pool,
+                             thread_pool=self.thread_pool, **self.kwargs)
+        changes = self.__diff(result)
+        now = time.monotonic()
+        for key in keys:
+            spread = random.uniform(-self.jitter, self.jitter) * self.interval
+            self.next_due[key] = now + self.interval + spread
+        logging.info(f'Polled {len(keys)} device(s), {len(changes)} with changes')
+        if self.callback is not None and len(changes) > 0:
+            try:
+                self.callback(changes)
+            except Exception as error:
+                logging.error(f'Poller callback failed - {error}')
+        return changes
+
+    def run(self, cycles: int = None) -> None:
+        """poll due devices until stop() is called or cycles polls were done
+
+        Args:
+            cycles (int, optional): number of polls before returning. Defaults to None (run until stopped).
+        """
+        done = 0
+        try:
+            while not self.stopped.is_set() and (cycles is None or done < cycles):
+                now = time.monotonic()
+                due = [key for key, when in self.next_due.items() if when <= now]
+                if len(due) > 0:
+                    self.poll_once(due)
+                    done += 1
+                    continue
+                self.stopped.wait(max(0, min(self.next_due.values()) - now))
+        finally:
+            if cycles is None or self.stopped.is_set():
+                self.close()
+
+    def stop(self) -> None:
+        """stop run() after the current poll
+        """
+        self.stopped.set()
+
+    def close(self) -> None:
+        """close warm sessions and worker pool
+        """
+        self.session_pool.close_all()
+        self.thread_pool.close()
+        self.thread_pool.join()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+"""
+|   Profiling of collection runs for mtcollector.                       |
+|   'cprofile' aggregates cProfile stats of all pool tasks into one     |
+|   pstats file, 'sample' samples every thread stack and writes         |
+|   collapsed stacks (flamegraph.pl / speedscope input).                |
+"""
+
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+
+PROFILE_MODES = ('cprofile', 'sample')
+
+
+class Profiler:
+    """Profiler of a single collection run
+    """
+    def __init__(self, mode: str = 'cprofile', filename: str = None, interval: float = 0.005) -> None:
+        """main init for profiler
+
+        Args:
+            mode (str, optional): 'cprofile' or 'sample'. Defaults to 'cprofile'.
+            filename (str, optional): output file. Defaults to mtcollector-<time>-<pid>.pstats/.collapsed
+                                      in the working directory.
+            interval (float, optional): seconds between stack samples ('sample' only). Defaults to 0.005.
+
+        Raises:
+            ValueError: if mode not in PROFILE_MODES
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f'profile mode {mode} not supported, use one of {PROFILE_MODES}')
+        if filename is None:
+            extension = 'pstats' if mode == 'cprofile' else 'collapsed'
+            filename = f'mtcollector-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}.{extension}'
+        self.mode = mode
+        self.filename = filename
+        self.interval = interval
+        # before 3.12 cProfile only sees the thread that enabled it, so each pool task gets its own
+        # profile and stats are merged; from 3.12 one profile sees all threads
+        self.per_task = mode == 'cprofile' and sys.version_info < (3, 12)
+        self.stats = None
+        self.profile = None
+        self.samples = Counter()  # collapsed stack: count
+        self.sampler = None
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+
+    def wrap(self, func):
+        """routine to submit to the pool in place of func, profiled per task when needed
+
+        Args:
+            func (callable): pool task
+
+        Returns:
+            callable: func itself, or a wrapper adding its profile to the run stats
+        """
+        if not self.per_task:
+            return func
+
+        def profiled(*args):
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(func, *args)
+            finally:
+                with self.lock:
+                    if self.stats is None:
+                        self.stats = pstats.Stats(profile)
+                    else:
+                        self.stats.add(profile)
+        return profiled
+
+    def __sample_loop(self) -> None:
+        """sampler thread, counts the stack of every other thread each interval
+        """
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        """start profiling the run
+        """
+        if self.mode == 'sample':
+            self.stopped.clear()
+            self.sampler = threading.Thread(target=self.__sample_loop, name='mtcollector-sampler', daemon=True)
+            self.sampler.start()
+        elif not self.per_task:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop(self) -> str:
+        """stop profiling and write results
+
+        Returns:
+            str: output file, None if nothing was profiled
+        """
+        if self.mode == 'sample':
+            self.stopped.set()
+            if self.sampler is not None:
+                self.sampler.join()
+            with open(self.filename, 'w') as write_file:
+                for stack, count in self.samples.most_common():
+                    write_file.write(f'{stack} {count}\n')
+        else:
+            if self.profile is not None:
+                self.profile.disable()
+                self.stats = pstats.Stats(self.profile)
+            if self.stats is None:
+                logging.info('Profiler: no task profiled')
+                return None
+            self.stats.dump_stats(self.filename)
+        logging.info(f'Profiler: {self.mode} results written to {self.filename}')
+        return self.filename
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+"""
+|   Live progress reporting for mtcollector.                            |
+|   Counts device events as they happen and reports done, failed, in    |
+|   flight, rate, ETA and slowest sessions from a reporter thread.      |
+"""
+
+import heapq
+import logging
+import threading
+import time
+from .hooks import Hooks
+
+
+class Progress:
+    """Progress of a collection run, updated from device hooks
+
+    Snapshot passed to callback:
+        {'total', 'done', 'failed', 'in_flight', 'elapsed', 'rate', 'eta', 'slowest'}
+        rate: finished devices/sec, eta: seconds left (None until a device finished),
+        slowest: [(hostname, seconds connected)] of the longest running sessions
+    """
+    def __init__(self,
+                 callback=None,
+                 interval: float = 10,
+                 log: bool = True,
+                 slowest: int = 3) -> None:
+        """main init for progress
+
+        Args:
+            callback (callable, optional): called as callback(snapshot) every interval and at the end.
+                                           Defaults to None.
+            interval (float, optional): seconds between reports. Defaults to 10.
+            log (bool, optional): also log a progress line at INFO every interval. Defaults to True.
+            slowest (int, optional): number of slowest sessions reported. Defaults to 3.
+        """
+        self.callback = callback
+        self.interval = interval
+        self.log = log
+        self.slowest = slowest
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.in_flight = {}  # hostname: connected at (monotonic)
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.reporter = None
+        self.hooks = Hooks(on_connect=self.on_connect,
+                           on_device_done=self.on_device_done,
+                           on_failure=self.on_failure)
+
+    def on_connect(self, hostname: str) -> None:
+        with self.lock:
+            self.in_flight.setdefault(hostname, time.monotonic())  # heavy lane reconnect keeps first time
+
+    def on_device_done(self, hostname: str, outputs: list) -> None:
+        with self.lock:
+            self.in_flight.pop(hostname, None)
+            self.done += 1
+
+    def on_failure(self, hostname: str, status: str) -> None:
+        with self.lock:
+            self.in_flight.pop(hostname, None)
+            self.failed += 1
+
+    def snapshot(self) -> dict:
+        """current progress
+
+        Returns:
+            dict: see class docstring
+        """
+        now = time.monotonic()
+        with self.lock:
+            finished = self.done + self.failed
+            snapshot = {'total': self.total, 'done': self.done, 'failed': self.failed,
+                        'in_flight': len(self.in_flight)}
+            oldest = heapq.nsmallest(self.slowest, self.in_flight.items(), key=lambda item: item[1])
+        elapsed = now - self.started
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        snapshot['elapsed'] = elapsed
+        snapshot['rate'] = rate
+        snapshot['eta'] = (self.total - finished) / rate if rate > 0 else None
+        snapshot['slowest'] = [(hostname, now - connected) for hostname, connected in oldest]
+        return snapshot
+
+    @staticmethod
+    def format(snapshot: dict) -> str:
+        """single line text of a snapshot
+
+        Args:
+            snapshot (dict): from snapshot()
+
+        Returns:
+            str: progress line
+        """
+        eta = '?' if snapshot['eta'] is None else f"{snapshot['eta']:.0f}s"
+        line = (f"{snapshot['done'] + snapshot['failed']}/{snapshot['total']} devices "
+                f"({snapshot['done']} done, {snapshot['failed']} failed, {snapshot['in_flight']} in flight) "
+                f"{snapshot['rate']:.2f}/s ETA {eta}")
+        if len(snapshot['slowest']) > 0:
+            line += ' slowest: ' + ', '.join(f'{hostname} {seconds:.0f}s' for hostname, seconds in snapshot['slowest'])
+        return line
+
+    def report(self) -> None:
+        """send a snapshot to callback and log, errors of callback are logged
+        """
+        snapshot = self.snapshot()
+        if self.log:
+            logging.info('Progress: %s', self.format(snapshot))
+        if self.callback is not None:
+            try:
+                self.callback(snapshot)
+            except Exception as error:
+                logging.error(f'Progress callback failed - {error}')
+
+    def __report_loop(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.report()
+
+    def start(self, total: int) -> None:
+        """reset counters and start reporter thread
+
+        Args:
+            total (int): devices in the run
+        """
+        with self.lock:
+            self.total = total
+            self.done = 0
+            self.failed = 0
+            self.in_flight = {}
+            self.started = time.monotonic()
+        self.stopped.clear()
+        self.reporter = threading.Thread(target=self.__report_loop, name='mtcollector-progress', daemon=True)
+        self.reporter.start()
+
+    def stop(self) -> None:
+        """stop reporter thread and send a final report
+        """
+        self.stopped.set()
+        if self.reporter is not None:
+            self.reporter.join()
+            self.reporter = None
+        self.report()
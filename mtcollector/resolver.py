@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+"""
+|   Hostname resolution for mtcollector.                                |
+|   Resolves device names in parallel with getaddrinfo and keeps the    |
+|   addresses in a TTL cache that can be persisted between runs.        |
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DNSCache:
+    """Name to address cache with TTL, optionally persisted to a json file
+    """
+    def __init__(self,
+                 filename: str = None,
+                 ttl: float = 300,
+                 negative_ttl: float = 30,
+                 workers: int = 16) -> None:
+        """main init for dns cache
+
+        Args:
+            filename (str, optional): /path/file.json where entries are kept between runs. Defaults to None.
+            ttl (float, optional): seconds a resolved address is reused. Defaults to 300.
+            negative_ttl (float, optional): seconds a failed lookup is remembered. Defaults to 30.
+            workers (int, optional): max parallel getaddrinfo calls. Defaults to 16.
+        """
+        self.filename = filename
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.workers = workers
+        self.entries = {}  # name: [address or None, expires (epoch)]
+        self.lock = threading.Lock()
+        if filename is not None:
+            self.load()
+
+    def load(self) -> None:
+        """load entries from file, missing or unreadable file starts an empty cache
+        """
+        try:
+            with open(self.filename, 'r') as read_file:
+                self.entries = json.load(read_file).get('entries', {})
+        except FileNotFoundError:
+            self.entries = {}
+        except (ValueError, AttributeError) as error:
+            logging.error(f'DNS cache {self.filename} unreadable, starting empty - {error}')
+            self.entries = {}
+
+    def save(self) -> None:
+        """write unexpired entries to file (atomic replace), no-op without filename
+        """
+        if self.filename is None:
+            return
+        now = time.time()
+        with self.lock:
+            content = {'entries': {name: entry for name, entry in self.entries.items() if entry[1] > now}}
+        temp_file = f'{self.filename}.tmp'
+        with open(temp_file, 'w') as write_file:
+            json.dump(content, write_file, indent=4)
+        os.replace(temp_file, self.filename)
+
+    def lookup(self, name: str):
+        """cached entry of a name
+
+        Args:
+            name (str): hostname
+
+        Returns:
+            tuple: (True, address or None) if cached and not expired, else (False, None)
+        """
+        with self.lock:
+            entry = self.entries.get(name)
+        if entry is None or entry[1] <= time.time():
+            return False, None
+        return True, entry[0]
+
+    def store(self, name: str, address: str) -> None:
+        """cache an address, None marks a failed lookup
+
+        Args:
+            name (str): hostname
+            address (str): resolved address or None
+        """
+        ttl = self.ttl if address is not None else self.negative_ttl
+        with self.lock:
+            self.entries[name] = [address, time.time() + ttl]
+
+    def resolve(self, name: str) -> str:
+        """resolve a single name with getaddrinfo, bypassing the cache
+
+        Args:
+            name (str): hostname
+
+        Returns:
+            str: first address returned (IPv4 or IPv6), None if name does not resolve
+        """
+        try:
+            info = socket.getaddrinfo(name, 22, type=socket.SOCK_STREAM)
+        except (socket.gaierror, UnicodeError) as error:
+            logging.error(f'Unable to resolve {name} - {error}')
+            return None
+        return info[0][4][0]
+
+    def resolve_all(self, names: list) -> dict:
+        """resolve names, cache misses are looked up in parallel
+
+        Args:
+            names (list): hostnames
+
+        Returns:
+            dict: {name: address or None}
+        """
+        addresses = {}
+        missing = []
+        for name in dict.fromkeys(names):  # unique, input order
+            cached, address = self.lookup(name)
+            if cached:
+                addresses[name] = address
+            else:
+                missing.append(name)
+        if len(missing) > 0:
+            logging.info(f'Resolving {len(missing)} hostname(s), {len(addresses)} cached')
+            with ThreadPoolExecutor(min(self.workers, len(missing)), thread_name_prefix='mtcollector-dns') as pool:
+                for name, address in zip(missing, pool.map(self.resolve, missing)):
+                    self.store(name, address)
+                    addresses[name] = address
+        return addresses
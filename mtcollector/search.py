@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+
+"""
+|   Search index for mtcollector outputs.                               |
+|   N-gram inverted index over (device, command) outputs, built while   |
+|   collecting; substring and regex queries only verify the outputs     |
+|   that contain every n-gram of the query.                             |
+"""
+
+import json
+import os
+import re
+import threading
+from array import array
+from .hooks import Hooks
+
+
+def required_literals(pattern: str) -> list:
+    """literal strings every match of a regex must contain, conservative: alternation,
+    inline flags and anything inside groups give no literal
+
+    Args:
+        pattern (str): regular expression
+
+    Returns:
+        list: literal strings (may be empty)
+    """
+    if '|' in pattern or '(?' in pattern:
+        return []
+    literals = []
+    current = ''
+    depth = 0
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        index += 1
+        if char == '\\' and index < len(pattern):
+            escaped = pattern[index]
+            index += 1
+            if depth == 0 and not escaped.isalnum():  # \. \- ... are literal, \d \b \1 are not
+                current += escaped
+                continue
+            if escaped in 'xuUN' or escaped.isdigit():  # \x41 \u0041 \N{..} \101 \1: arguments are not text
+                return []
+            char = '.'  # class or reference, ends the literal
+        if char in '*?' or char == '{':  # previous char is optional
+            current = current[:-1]
+            if char == '{':
+                index = pattern.find('}', index) + 1 or len(pattern)
+        elif char == '[':  # skip the set, ']' right after '[' or '[^' belongs to it
+            end = index + 1 if pattern.startswith('^', index) else index
+            end += 1 if pattern.startswith(']', end) else 0
+            while end < len(pattern) and pattern[end] != ']':
+                end += 2 if pattern[end] == '\\' else 1
+            index = end + 1
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth = max(0, depth - 1)
+        elif char == '+' or depth > 0:
+            pass
+        elif char not in '.^$':
+            current += char
+            continue
+        if len(current) > 0:
+            literals.append(current)
+        current = ''
+    if len(current) > 0:
+        literals.append(current)
+    return literals
+
+
+class OutputIndex:
+    """N-gram index of outputs, one document per (device, command)
+    """
+    def __init__(self, n: int = 3) -> None:
+        """main init for output index
+
+        Args:
+            n (int, optional): n-gram length, queries shorter than n scan all outputs. Defaults to 3.
+        """
+        self.n = n
+        self.docs = []  # id: [device, command, output], None when replaced by a later run
+        self.keys = {}  # (device, command): id
+        self.postings = {}  # gram: array of ids, ascending
+        self.lock = threading.Lock()
+        self.hooks = Hooks(on_device_done=self.on_device_done)
+
+    def grams(self, text: str) -> set:
+        n = self.n
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def add(self, device: str, command: str, output: str) -> None:
+        """index an output, replaces a previous output of the same device and command
+
+        Args:
+            device (str): device name
+            command (str): command sent
+            output (str/InternedOutput): command output, kept as given
+        """
+        grams = self.grams(str(output))  # outside the lock, the expensive part
+        with self.lock:
+            previous = self.keys.get((device, command))
+            if previous is not None:
+                self.docs[previous] = None
+            doc_id = len(self.docs)
+            self.docs.append([device, command, output])
+            self.keys[(device, command)] = doc_id
+            for gram in grams:
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array('I')
+                posting.append(doc_id)
+
+    def on_device_done(self, hostname: str, outputs: list) -> None:
+        for pair in outputs:
+            for show, output in pair.items():
+                self.add(hostname, show, output)
+
+    def __candidates(self, literals: list) -> list:
+        """ids of documents containing every n-gram of literals
+
+        Args:
+            literals (list): strings the matches contain
+
+        Returns:
+            list: document ids, all documents if no literal is long enough
+        """
+        grams = set()
+        for literal in literals:
+            grams |= self.grams(literal)
+        with self.lock:
+            if len(grams) == 0:
+                return [doc_id for doc_id, doc in enumerate(self.docs) if doc is not None]
+            postings = [self.postings.get(gram, ()) for gram in grams]
+        postings.sort(key=len)  # intersect from the rarest gram
+        if len(postings[0]) == 0:
+            return []
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if len(candidates) == 0:
+                break
+        return sorted(candidates)
+
+    def __matches(self, doc_ids: list, test) -> list:
+        results = []
+        for doc_id in doc_ids:
+            doc = self.docs[doc_id]
+            if doc is not None and test(str(doc[2])):
+                results.append((doc[0], doc[1]))
+        return results
+
+    def search(self, text: str) -> list:
+        """outputs containing a substring
+
+        Args:
+            text (str): substring
+
+        Returns:
+            list: list of (device, command)
+        """
+        return self.__matches(self.__candidates([text]), lambda output: text in output)
+
+    def search_regex(self, pattern: str, flags: int = 0) -> list:
+        """outputs matching a regex, prefiltered by the literals it requires
+
+        Args:
+            pattern (str): regular expression
+            flags (int, optional): re flags, re.IGNORECASE and re.VERBOSE disable the prefilter. Defaults to 0.
+
+        Returns:
+            list: list of (device, command)
+        """
+        regex = re.compile(pattern, flags)
+        literals = [] if flags & (re.IGNORECASE | re.VERBOSE) else required_literals(pattern)
+        return self.__matches(self.__candidates(literals), lambda output: regex.search(output) is not None)
+
+    def save(self, filename: str) -> None:
+        """write index to a json file (atomic replace)
+
+        Args:
+            filename (str): /path/file.json
+        """
+        with self.lock:
+            content = {
+                'n': self.n,
+                'docs': [doc if doc is None else [doc[0], doc[1], str(doc[2])] for doc in self.docs],
+                'postings': {gram: posting.tolist() for gram, posting in self.postings.items()},
+            }
+        temp_file = f'{filename}.tmp'
+        with open(temp_file, 'w') as write_file:
+            json.dump(content, write_file)
+        os.replace(temp_file, filename)
+
+    @classmethod
+    def load(cls, filename: str):
+        """read an index written by save()
+
+        Args:
+            filename (str): /path/file.json
+
+        Returns:
+            OutputIndex: loaded index, new outputs can still be added
+        """
+        with open(filename, 'r') as read_file:
+            content = json.load(read_file)
+        index = cls(content['n'])
+        index.docs = content['docs']
+        index.keys = {(doc[0], doc[1]): doc_id for doc_id, doc in enumerate(index.docs) if doc is not None}
+        index.postings = {gram: array('I', posting) for gram, posting in content['postings'].items()}
+        return index
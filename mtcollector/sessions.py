@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+"""
+|   Warm session pool for mtcollector.                                  |
+|   Keeps idle netmiko sessions open between jobs so repeated           |
+|   collections skip SSH setup.                                         |
+"""
+
+import logging
+import threading
+import time
+
+
+class SessionPool:
+    """Idle netmiko sessions keyed by (ip, username, password digest, os_type, proxy, tuning profile)
+    """
+    def __init__(self, idle_timeout: float = 300, max_idle: int = 1000) -> None:
+        """main init for session pool
+
+        Args:
+            idle_timeout (float, optional): seconds an idle session is kept. Defaults to 300.
+            max_idle (int, optional): max idle sessions kept, oldest are closed first. Defaults to 1000.
+        """
+        self.idle_timeout = idle_timeout
+        self.max_idle = max_idle
+        self.idle = {}  # key: (connection, last used)
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def __close(connection) -> None:
+        """disconnect ignoring errors of already dead sessions
+
+        Args:
+            connection (netmiko object): session to close
+        """
+        try:
+            connection.disconnect()
+        except Exception as error:
+            logging.debug(f'Error closing idle session - {error}')
+
+    def checkout(self, key: tuple):
+        """take an idle session for key if one is alive
+
+        Args:
+            key (tuple): session key
+
+        Returns:
+            netmiko object: live connection, None if no usable session
+        """
+        with self.lock:
+            entry = self.idle.pop(key, None)
+        if entry is None:
+            return None
+        connection, last_used = entry
+        if time.monotonic() - last_used > self.idle_timeout:
+            self.__close(connection)
+            return None
+        try:
+            alive = connection.is_alive()
+        except Exception:
+            alive = False
+        if not alive:
+            self.__close(connection)
+            return None
+        logging.info(f'Reusing warm session for {key[0]}')
+        return connection
+
+    def checkin(self, key: tuple, connection) -> None:
+        """return a session to the pool after a successful collection
+
+        Args:
+            key (tuple): session key
+            connection (netmiko object): session to keep
+        """
+        closing = []
+        with self.lock:
+            previous = self.idle.pop(key, None)
+            if previous is not None:
+                closing.append(previous[0])
+            self.idle[key] = (connection, time.monotonic())
+            while len(self.idle) > self.max_idle:  # dicts keep insertion order, first is oldest
+                oldest = next(iter(self.idle))
+                closing.append(self.idle.pop(oldest)[0])
+        for conn in closing:
+            self.__close(conn)
+
+    def expire_idle(self) -> int:
+        """close sessions idle for longer than idle_timeout
+
+        Returns:
+            int: number of sessions closed
+        """
+        now = time.monotonic()
+        with self.lock:
+            expired = [key for key, (conn, last_used) in self.idle.items() if now - last_used > self.idle_timeout]
+            closing = [self.idle.pop(key)[0] for key in expired]
+        for conn in closing:
+            self.__close(conn)
+        return len(closing)
+
+    def close_all(self) -> None:
+        """close every idle session
+        """
+        with self.lock:
+            closing = [conn for conn, last_used in self.idle.values()]
+            self.idle = {}
+        for conn in closing:
+            self.__close(conn)
+
+    def __len__(self) -> int:
+        return len(self.idle)
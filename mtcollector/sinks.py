@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+"""
+|   Result sinks for mtcollector.                                       |
+|   SQLiteSink writes outputs while collection is running, from a       |
+|   single writer thread with batched executemany transactions.         |
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from functools import partial
+from .hooks import Hooks
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    device TEXT NOT NULL,
+    command TEXT,
+    output TEXT,
+    received REAL NOT NULL,
+    duration REAL,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_run_device ON results (run_id, device);
+"""
+
+INSERT = 'INSERT INTO results (run_id, device, command, output, received, duration, status) VALUES (?, ?, ?, ?, ?, ?, ?)'
+
+
+class SQLiteSink:
+    """Stores (run, device, command, output, timings, status) rows in SQLite
+
+    A sink can be shared by concurrent jobs, each job writes through the hooks of its own run:
+        run_id = sink.begin_run(); hooks = sink.run_hooks(run_id); ...; sink.end_run(run_id)
+    """
+    def __init__(self,
+                 filename: str,
+                 batch_size: int = 500,
+                 flush_interval: float = 1.0,
+                 max_queue: int = 10000) -> None:
+        """main init for sqlite sink, starts the writer thread
+
+        Args:
+            filename (str): /path/file.db
+            batch_size (int, optional): rows per transaction. Defaults to 500.
+            flush_interval (float, optional): max seconds a row waits before commit. Defaults to 1.0.
+            max_queue (int, optional): max rows waiting for the writer, workers wait when reached. Defaults to 10000.
+        """
+        self.filename = filename
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows = queue.Queue(max_queue)
+        self.last_event = {}  # (run_id, device): time of previous event, command duration = delta
+        self.lock = threading.Lock()
+        connection = sqlite3.connect(filename)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(SCHEMA)
+        connection.close()
+        self.writer = threading.Thread(target=self.__write_loop, name='mtcollector-sqlite', daemon=True)
+        self.writer.start()
+
+    def __write_loop(self) -> None:
+        """writer thread, commits batches of rows until None is received
+        """
+        connection = sqlite3.connect(self.filename)
+        connection.execute('PRAGMA synchronous=NORMAL')  # safe with WAL, avoids fsync per commit
+        running = True
+        while running:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    row = self.rows.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is None:
+                    running = False
+                    break
+                batch.append(row)
+            if len(batch) == 0:
+                continue
+            try:
+                with connection:  # one transaction per batch
+                    connection.executemany(INSERT, batch)
+            except sqlite3.Error as error:
+                logging.error(f'SQLite sink failed writing {len(batch)} row(s) - {error}')
+        connection.close()
+
+    def begin_run(self) -> int:
+        """create a run row, rows written through run_hooks(run_id) belong to it
+
+        Returns:
+            int: run id
+        """
+        connection = sqlite3.connect(self.filename)
+        with connection:
+            cursor = connection.execute('INSERT INTO runs (started) VALUES (?)', (time.time(),))
+        connection.close()
+        return cursor.lastrowid
+
+    def end_run(self, run_id: int) -> None:
+        """mark a run finished
+
+        Args:
+            run_id (int): run id returned by begin_run
+        """
+        connection = sqlite3.connect(self.filename)
+        with connection:
+            connection.execute('UPDATE runs SET finished = ? WHERE id = ?', (time.time(), run_id))
+        connection.close()
+
+    def run_hooks(self, run_id: int) -> Hooks:
+        """device hooks writing rows of a run
+
+        Args:
+            run_id (int): run id returned by begin_run
+
+        Returns:
+            Hooks: hooks for the job of that run
+        """
+        return Hooks(on_connect=partial(self.on_connect, run_id),
+                     on_command_output=partial(self.on_command_output, run_id),
+                     on_device_done=partial(self.on_device_done, run_id),
+                     on_failure=partial(self.on_failure, run_id))
+
+    def __elapsed(self, run_id: int, hostname: str, now: float) -> float:
+        with self.lock:
+            previous = self.last_event.get((run_id, hostname))
+            self.last_event[(run_id, hostname)] = now
+        return None if previous is None else now - previous
+
+    def on_connect(self, run_id: int, hostname: str) -> None:
+        self.__elapsed(run_id, hostname, time.monotonic())
+
+    def on_command_output(self, run_id: int, hostname: str, show: str, output: str) -> None:
+        duration = self.__elapsed(run_id, hostname, time.monotonic())
+        self.rows.put((run_id, hostname, show, output, time.time(), duration, 'ok'))
+
+    def on_device_done(self, run_id: int, hostname: str, outputs: list) -> None:
+        with self.lock:
+            self.last_event.pop((run_id, hostname), None)
+
+    def on_failure(self, run_id: int, hostname: str, status: str) -> None:
+        with self.lock:
+            self.last_event.pop((run_id, hostname), None)
+        self.rows.put((run_id, hostname, None, None, time.time(), None, status))
+
+    def close(self) -> None:
+        """flush queued rows and stop writer thread
+        """
+        self.rows.put(None)
+        self.writer.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+"""
+|   Deduplicated output store for mtcollector.                          |
+|   Lines shared by outputs of many devices (same model configs) are    |
+|   kept once in a line table, each output keeps an array of line ids   |
+|   and the string is rebuilt on access.                                |
+"""
+
+import threading
+from array import array
+
+
+class InternedOutput:
+    """Output kept as line ids of a LineStore, used like the str it replaces
+
+    str methods, comparison, len, 'in' and + (both sides) are resolved on the rebuilt string.
+    """
+    __slots__ = ('store', 'ids')
+
+    def __init__(self, store, ids: array) -> None:
+        """main init for interned output
+
+        Args:
+            store (LineStore): line table
+            ids (array): line ids of the output
+        """
+        self.store = store
+        self.ids = ids
+
+    def __str__(self) -> str:
+        return self.store.rebuild(self.ids)
+
+    def __repr__(self) -> str:
+        return repr(str(self))
+
+    def __len__(self) -> int:
+        return len(str(self))
+
+    def __eq__(self, other) -> bool:
+        return str(self) == str(other) if isinstance(other, (str, InternedOutput)) else NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __contains__(self, item: str) -> bool:
+        return item in str(self)
+
+    def __add__(self, other) -> str:
+        return str(self) + other
+
+    def __radd__(self, other) -> str:
+        return other + str(self)
+
+    def stored_size(self) -> int:
+        """memory held by this output, its line ids (lines are shared in the store)
+
+        Returns:
+            int: bytes of the id array
+        """
+        return self.ids.itemsize * len(self.ids)
+
+    def __getattr__(self, name: str):
+        if name in InternedOutput.__slots__:  # not set yet (unpickling)
+            raise AttributeError(name)
+        return getattr(str(self), name)  # splitlines, encode, find...
+
+    def __getstate__(self):
+        return self.store, self.ids
+
+    def __setstate__(self, state) -> None:
+        self.store, self.ids = state
+
+
+class LineStore:
+    """Line table shared by all outputs of one or more runs
+    """
+    def __init__(self) -> None:
+        self.lines = []  # id: line
+        self.ids = {}  # line: id
+        self.lock = threading.Lock()
+
+    def intern(self, output: str) -> InternedOutput:
+        """store an output as line ids, new lines are added to the table
+
+        Args:
+            output (str): command output
+
+        Returns:
+            InternedOutput: replacement for output
+        """
+        ids = array('I')
+        with self.lock:  # once per output, not per line
+            for line in output.split('\n'):
+                line_id = self.ids.get(line)
+                if line_id is None:
+                    line_id = len(self.lines)
+                    self.lines.append(line)
+                    self.ids[line] = line_id
+                ids.append(line_id)
+        return InternedOutput(self, ids)
+
+    def rebuild(self, ids: array) -> str:
+        """output string of line ids
+
+        Args:
+            ids (array): line ids
+
+        Returns:
+            str: output
+        """
+        lines = self.lines
+        return '\n'.join([lines[line_id] for line_id in ids])
+
+    def __getstate__(self):
+        return self.lines
+
+    def __setstate__(self, lines: list) -> None:
+        self.lines = lines
+        self.ids = {line: line_id for line_id, line in enumerate(lines)}
+        self.lock = threading.Lock()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+"""
+|   Per-platform session tuning for mtcollector.                        |
+|   A profile holds netmiko connect arguments plus send options:        |
+|     connect: kwargs for ConnectHandler (fast_cli, global_delay_factor)|
+|     expect_prompt: find prompt once, send it as expect_string         |
+|     skip_pagination: skip session preparation (terminal length and   |
+|                      width), only for devices with paging already off |
+"""
+
+import json
+import logging
+import os
+import re
+
+
+# netmiko defaults, reference for calibration
+SAFE_PROFILE = {}
+
+# static profiles per netmiko device_type
+TUNING_PROFILES = {
+    'cisco_xr': {'connect': {'fast_cli': True, 'global_delay_factor': 1}, 'expect_prompt': True},
+    'cisco_xe': {'connect': {'fast_cli': True, 'global_delay_factor': 1}, 'expect_prompt': True},
+    'cisco_ios': {'connect': {'fast_cli': True, 'global_delay_factor': 1}, 'expect_prompt': True},
+    'cisco_nxos': {'connect': {'fast_cli': True, 'global_delay_factor': 1}, 'expect_prompt': True},
+    'juniper_junos': {'connect': {'fast_cli': True, 'global_delay_factor': 1}, 'expect_prompt': True},
+    'arista_eos': {'connect': {'fast_cli': True, 'global_delay_factor': 1}, 'expect_prompt': True},
+}
+
+# calibration candidates, fastest first. No skip_pagination: a probe shorter than a page
+# cannot tell paging is off, so it is only set in explicit profiles
+CANDIDATES = [
+    {'connect': {'fast_cli': True, 'global_delay_factor': 0.5}, 'expect_prompt': True},
+    {'connect': {'fast_cli': True, 'global_delay_factor': 1}, 'expect_prompt': True},
+    {'connect': {'fast_cli': True, 'global_delay_factor': 1}},
+]
+
+# lines changing between two reads of the same show: uptime, clock, time banners, per-interval rates
+VOLATILE_LINE = re.compile(r'uptime|\bup\s+\d|\d{1,2}:\d\d:\d\d|\b\d+\s+(second|minute|hour|day|week|month|year)s?\b'
+                           r'|\bago\b', re.IGNORECASE)
+
+
+def stable_lines(output: str) -> list:
+    """lines of a calibration probe output that must be equal between reads
+
+    Args:
+        output (str): probe output
+
+    Returns:
+        list: stripped lines, volatile and blank lines dropped
+    """
+    return [line.strip() for line in output.splitlines() if line.strip() and not VOLATILE_LINE.search(line)]
+
+
+def connect_kwargs(profile: dict) -> dict:
+    """extra ConnectHandler arguments of a profile
+
+    Args:
+        profile (dict): tuning profile
+
+    Returns:
+        dict: kwargs added to the netmiko connection dict
+    """
+    kwargs = dict(profile.get('connect', {}))
+    if profile.get('skip_pagination'):
+        kwargs['auto_connect'] = False  # session is opened by open_session
+    return kwargs
+
+
+def open_session(connection, profile: dict) -> None:
+    """complete connection opened with auto_connect=False, skipping session preparation
+
+    Same steps as netmiko BaseConnection._open() without session preparation: neither
+    set_terminal_width nor disable_paging is sent, so long lines may wrap and outputs stop
+    at a --More-- prompt unless the device (AAA/line config) already has paging disabled.
+    Never chosen by calibration, it must be set in an explicit profile.
+
+    Args:
+        connection (netmiko object): connection created by ConnectHandler
+        profile (dict): tuning profile
+    """
+    if profile.get('skip_pagination'):
+        connection._modify_connection_params()
+        connection.establish_connection()
+        connection.set_base_prompt()
+
+
+def load_profiles(filename: str) -> dict:
+    """load calibrated profiles
+
+    Args:
+        filename (str): /path/file.json written by save_profiles
+
+    Returns:
+        dict: {os_type: profile}, empty if file missing
+    """
+    try:
+        with open(filename, 'r') as read_file:
+            return json.load(read_file)
+    except FileNotFoundError:
+        return {}
+    except ValueError as error:
+        logging.error(f'Tuning file {filename} unreadable, using netmiko defaults - {error}')
+        return {}
+
+
+def save_profiles(filename: str, profiles: dict) -> None:
+    """save calibrated profiles (atomic replace)
+
+    Args:
+        filename (str): /path/file.json
+        profiles (dict): {os_type: profile}
+    """
+    temp_file = f'{filename}.tmp'
+    with open(temp_file, 'w') as write_file:
+        json.dump(profiles, write_file, indent=4)
+    os.replace(temp_file, filename)
@@ -0,0 +1,67 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import mtcollector.mtcollector
+from mtcollector.distributed import Coordinator
+
+
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                                reason='stubbed collector reaches local workers by fork only')
+
+
+def test_shard_of_dead_worker_is_requeued(tmp_path, monkeypatch):
+    marker = str(tmp_path / 'killed')
+
+    def collector(devices, shows, **kwargs):
+        if 'r5' in devices:
+            try:  # first worker holding this shard dies, the one it is re-queued to collects it
+                os.close(os.open(marker, os.O_CREAT | os.O_EXCL))
+                os._exit(1)
+            except FileExistsError:
+                pass
+        return {device: [{show: f'{device} {show}'} for show in shows] for device in devices}
+
+    monkeypatch.setattr(mtcollector.mtcollector, 'MTCollector', collector)
+    devices = [f'r{i}' for i in range(6)]
+    coordinator = Coordinator(str(tmp_path / 'coordinator.sock'), authkey=b'test', shard_size=2)
+
+    result = coordinator.run(devices, ['show version'], local_workers=2, timeout=30)
+
+    assert os.path.exists(marker)
+    assert 'not_collected' not in result
+    assert sorted(result) == devices
+    assert result['r5'] == [{'show version': 'r5 show version'}]
+
+
+def test_run_ends_when_all_local_workers_died(tmp_path, monkeypatch):
+    def collector(devices, shows, **kwargs):
+        os._exit(1)
+
+    monkeypatch.setattr(mtcollector.mtcollector, 'MTCollector', collector)
+    devices = [f'r{i}' for i in range(4)]
+    coordinator = Coordinator(str(tmp_path / 'coordinator.sock'), authkey=b'test', shard_size=2)
+    started = time.monotonic()
+
+    result = coordinator.run(devices, ['show version'], local_workers=2, timeout=60)
+
+    assert time.monotonic() - started < 30
+    assert sorted(result['not_collected']) == devices
+
+
+def test_shard_crashing_every_worker_is_given_up(tmp_path, monkeypatch):
+    def collector(devices, shows, **kwargs):
+        if 'r5' in devices:
+            os._exit(1)
+        return {device: [{show: f'{device} {show}'} for show in shows] for device in devices}
+
+    monkeypatch.setattr(mtcollector.mtcollector, 'MTCollector', collector)
+    devices = [f'r{i}' for i in range(6)]
+    coordinator = Coordinator(str(tmp_path / 'coordinator.sock'), authkey=b'test', shard_size=2, max_attempts=2)
+
+    result = coordinator.run(devices, ['show version'], local_workers=3, timeout=60)
+
+    assert result['not_collected'] == ['r4', 'r5']
+    assert sorted(key for key in result if key != 'not_collected') == devices[:4]
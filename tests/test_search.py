@@ -0,0 +1,76 @@
+import random
+import re
+
+import pytest
+
+from mtcollector.search import OutputIndex, required_literals
+from mtcollector.store import LineStore
+
+
+OUTPUTS = {
+    ('r1', 'show version'): 'Cisco IOS XR Software, Version 7.3.2\nABC uptime is 3 weeks',
+    ('r1', 'show run'): 'hostname r1\ninterface Gi0/0/0/1\n description to r2 [core]\n ipv4 address 10.0.0.1/31',
+    ('r2', 'show version'): 'Arista vEOS\nSoftware image version: 4.27.0F\nabc',
+    ('r2', 'show run'): 'hostname r2\ninterface Ethernet1\n   description a.b*c\\d\n   mtu 9214',
+    ('r3', 'show log'): 'Jan  1 00:00:01 %LINK-3-UPDOWN: Interface Gi0/1, changed state to down\n\ttab',
+}
+
+PATTERNS = [
+    r'\x41BC', r'\101BC', r'\u0041BC', r'\U00000041BC', r'\N{LATIN CAPITAL LETTER A}BC',
+    r'(a)\1', r'ABC', r'hostname r\d', r'Gi0/0/0/\d+', r'description [a-z ]+r2', r'\[core\]',
+    r'a\.b\*c\\d', r'mtu 9\d{3}', r'^hostname', r'version: 4\.\d+', r'Version 7\.3\.2$',
+    r'uptime is \d+ weeks?', r'colou?r', r'state to (up|down)', r'%LINK-\d-UPDOWN', r'\tab', r'\btab\b',
+    r'Ethernet1\n', r'[]x]', r'[^a-z]BC', r'a{0}bc', r'Cis+co', r'XR|EOS', r'(?i)abc', r'inter.ace',
+]
+
+TOKENS = ['a', 'b', 'c', 'A', 'B', 'C', '0', '1', '.', '*', '+', '?', '{2}', '\\d', '\\x41', '\\101', '\\.',
+          '[ab]', '(b)', '^', '$', '\\n', '\\u0062', ' ', 'r', 'hostname', 'abc']
+
+
+@pytest.fixture
+def index():
+    index = OutputIndex()
+    for (device, command), output in OUTPUTS.items():
+        index.add(device, command, output)
+    return index
+
+
+def scan(pattern, flags=0):
+    regex = re.compile(pattern, flags)
+    return sorted(key for key, output in OUTPUTS.items() if regex.search(output) is not None)
+
+
+@pytest.mark.parametrize('pattern', PATTERNS)
+def test_search_regex_matches_full_scan(index, pattern):
+    assert sorted(index.search_regex(pattern)) == scan(pattern)
+
+
+def test_search_regex_matches_full_scan_random_patterns(index):
+    generator = random.Random(7)
+    for _ in range(2000):
+        pattern = ''.join(generator.choice(TOKENS) for _ in range(generator.randint(1, 6)))
+        try:
+            re.compile(pattern)
+        except re.error:
+            continue
+        assert sorted(index.search_regex(pattern)) == scan(pattern), pattern
+
+
+@pytest.mark.parametrize('pattern', [r'\x41BC', r'\101BC', r'\u0041BC', r'\U00000041BC', r'\N{DIGIT ONE}',
+                                     r'(a)\1'])
+def test_required_literals_skip_escape_arguments(pattern):
+    assert required_literals(pattern) == []
+
+
+def test_required_literals_of_plain_text():
+    assert required_literals(r'hostname r\d+ mtu') == ['hostname r', ' mtu']
+
+
+def test_index_keeps_interned_outputs():
+    store = LineStore()
+    index = OutputIndex()
+    for (device, command), output in OUTPUTS.items():
+        index.add(device, command, store.intern(output))
+    assert all(doc[2].store is store for doc in index.docs)
+    assert sorted(index.search('hostname r')) == [('r1', 'show run'), ('r2', 'show run')]
+    assert sorted(index.search_regex(r'mtu 9\d{3}')) == scan(r'mtu 9\d{3}')
@@ -0,0 +1,23 @@
+from mtcollector.tuning import stable_lines
+
+
+SHOW_VERSION = '''
+Mon Oct 19 06:19:27.052 UTC
+Cisco IOS XR Software, Version 7.3.2
+cisco ASR9K Series (Intel 686 F6M14S4) processor with 12582912K bytes of memory.
+System uptime is 3 weeks 2 days 1 hour 5 minutes
+r1 uptime is 3 weeks, 2 days, 1 hour, 5 minutes
+'''
+
+
+def test_stable_lines_drop_uptime_and_clock():
+    later = SHOW_VERSION.replace('06:19:27.052', '06:20:01.418').replace('5 minutes', '6 minutes')
+    assert stable_lines(later) == stable_lines(SHOW_VERSION) == [
+        'Cisco IOS XR Software, Version 7.3.2',
+        'cisco ASR9K Series (Intel 686 F6M14S4) processor with 12582912K bytes of memory.',
+    ]
+
+
+def test_stable_lines_tell_truncated_output():
+    truncated = SHOW_VERSION[:SHOW_VERSION.index('cisco ASR9K')]
+    assert stable_lines(truncated) != stable_lines(SHOW_VERSION)